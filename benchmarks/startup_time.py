@@ -0,0 +1,54 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup-time target for a headless pipeline run: importing main_pipeline may cost at
+# most this much on top of importing pandas itself, and must not load matplotlib.
+STARTUP_OVERHEAD_TARGET_S = 0.15
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(statement, repeat):
+    """
+    Median wall time (seconds) of a fresh interpreter running `statement`.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=REPO_ROOT, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure headless startup time of main_pipeline.py.")
+    parser.add_argument("--repeat", type=int, default=7, help="Number of fresh interpreters per measurement.")
+    args = parser.parse_args()
+
+    baseline = time_import("import pandas", args.repeat)
+    pipeline = time_import("import main_pipeline", args.repeat)
+    overhead = pipeline - baseline
+
+    leaked = subprocess.run(
+        [sys.executable, "-c", "import sys, main_pipeline; print(','.join(m for m in ('matplotlib', 'multiprocessing.shared_memory') if m in sys.modules))"],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+    print(f"[BENCH] import pandas:        {baseline * 1000:.0f} ms")
+    print(f"[BENCH] import main_pipeline: {pipeline * 1000:.0f} ms")
+    print(f"[BENCH] pipeline overhead:    {overhead * 1000:.0f} ms (target <= {STARTUP_OVERHEAD_TARGET_S * 1000:.0f} ms)")
+    if leaked:
+        print(f"[BENCH] FAIL: headless startup imports {leaked}")
+        sys.exit(1)
+    if overhead > STARTUP_OVERHEAD_TARGET_S:
+        print("[BENCH] FAIL: startup overhead above target")
+        sys.exit(1)
+    print("[BENCH] OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,476 @@
-from utils.plotData import (
-    plot_all_raw_data,
-    plot_direction_figure,
-    plot_camera_with_direction,
-    plot_camera_by_assigned_row,
-    plot_random_fov_projection,
-    visualize_matched_vines
-)
+from utils.getKinematics import compute_kinematics
 from utils.getMovingDirection import compute_moving_direction
 from utils.getCameraPosition import compute_camera_positions
+from utils.getCameraRig import load_camera_rig, compute_rig_camera_positions, compute_rig_fov_intersections
 from utils.getCaptureRow import assign_image_rows
-from utils.getFOVintersections import compute_fov_intersections
+from utils.getRowPasses import segment_row_passes
+from utils.getPoseInterpolation import GpsTrack, interpolate_image_poses, compute_track_kinematics
+from utils.getStationaryFrames import group_stationary_frames, collapse_stationary_frames
+from utils.getFOVintersections import compute_fov_intersections, camera_axes_from_kinematics
 from utils.getVineCoverage import compute_vine_coverage_variable
 from utils.matchVinesInCamFOV import match_vines_in_fov
+from utils.pipelineStages import Stage, run_stages, resolve_stages
+from utils.incrementalRun import (is_stale, plan_incremental_run, continue_pass_ids, new_records, records_to_write,
+                                  replace_last_records, merge_row_passes, continue_stationary_groups)
+from utils.asyncWriter import AsyncCsvWriter, write_csv
+import pandas as pd
 import argparse
-import gc
-import os
+
+# Visualization (matplotlib) and multiprocessing helpers are imported inside the
+# steps that use them, so headless runs do not pay for loading them.
+
+
+# Step 0: compute grapevine coverage and save to grapevine_coverage_file_output_path
+def stage_vine_coverage(args):
+    out_path = args.grapevine_coverage_file_output_path
+    if args.incremental and not is_stale(out_path, [args.row_file, args.grapevines_file]):
+        print(f"[INFO] Step 0: Reusing cached grapevine coverage {out_path} (vine and row files unchanged)")
+        return {"coverage_file": out_path}
+    print("[INFO] Step 0: Computing grapevine coverage region...")
+    compute_vine_coverage_variable(
+        row_file=args.row_file,
+        vine_file=args.grapevines_file,
+        out_path=args.grapevine_coverage_file_output_path,
+        extend_first_last=args.extend_first_last,
+        extend_not_continuous=args.extend_not_continuous,
+        max_half_extend=args.max_half_extend
+    )
+    return {"coverage_file": args.grapevine_coverage_file_output_path}
+
+
+# Step 1: optionally visualize raw data
+def stage_plot_raw_data(args):
+    print("[INFO] Visualizing raw data for debugging/inspection...")
+    from utils.plotData import plot_all_raw_data
+    plot_all_raw_data(args.grapevines_file, args.image_gps_file, args.row_file)
+
+
+def incremental_inputs(args):
+    # files the final output depends on besides the GPS log
+    return [args.row_file, args.grapevines_file, args.camera_rig_file, args.gps_track_file]
+
+
+# Step 1a0: optional separate GPS track the image poses are interpolated from
+def stage_track(args):
+    print(f"[INFO] Loading GPS track {args.gps_track_file}...")
+    track = GpsTrack.from_csv(args.gps_track_file, time_column=args.track_time_column)
+    print(f"[INFO] GPS track has {len(track.t)} fixes.")
+    return {"gps_track": track}
+
+
+# Step 1a: read the image GPS log (with --incremental only the new tail plus boundary context)
+def stage_gps(args, gps_track=None):
+    df_gps = pd.read_csv(args.image_gps_file).sort_values(by="Image_ID").reset_index(drop=True)
+    df_last = None
+    num_records = len(df_gps)
+    if args.incremental:
+        df_gps, df_last = plan_incremental_run(df_gps, args.final_output_path, incremental_inputs(args))
+        if df_last is None:
+            print(f"[INFO] No up-to-date {args.final_output_path}; processing the full log.")
+        else:
+            num_new = len(new_records(df_gps, df_last))
+            print(f"[INFO] Incremental run: {num_new} new records after Image_ID {df_last['Image_ID'].iloc[0]}.")
+    if gps_track is not None:
+        print(f"[INFO] Interpolating image poses from the GPS track at {args.image_time_column}...")
+        df_gps = interpolate_image_poses(df_gps, gps_track, time_column=args.image_time_column)
+    # position of the first processed record in the whole log (row pass indexes are global)
+    return {"df_gps": df_gps, "df_last": df_last, "log_offset": num_records - len(df_gps)}
+
+
+# Step 1b: shared kinematics (motion vectors, heading, speed) computed once for all stages
+def stage_kinematics(args, df_gps, gps_track=None):
+    print("[INFO] Computing shared kinematics (motion vectors, heading, speed)...")
+    if gps_track is not None:
+        return {"kinematics": compute_track_kinematics(df_gps, gps_track, time_column=args.image_time_column)}
+    return {"kinematics": compute_kinematics(df_gps)}
+
+
+# Step 2: compute movement direction
+def stage_direction(args, df_gps, kinematics):
+    print("[INFO] Computing movement direction classification (F/B)...")
+    df_with_direction = compute_moving_direction(gps_file=df_gps, row_file=args.row_file, kinematics=kinematics)
+    print("[Preview] First rows with direction:")
+    print(df_with_direction.head())
+    return {"df_with_direction": df_with_direction}
+
+
+# Step 3: optionally visualize direction
+def stage_plot_direction(args, df_with_direction):
+    print("[INFO] Visualizing GPS points by movement direction (F/B)...")
+    from utils.plotData import plot_direction_figure
+    plot_direction_figure(df_with_direction, args.row_file)
+
+
+# Step 4: compute camera position
+def stage_camera(args, df_gps, kinematics):
+    if args.camera_rig_file:
+        print(f"[INFO] Computing camera positions for all cameras in {args.camera_rig_file}...")
+        rig = load_camera_rig(args.camera_rig_file)
+        df_with_camera = compute_rig_camera_positions(df_gps, rig, kinematics=kinematics)
+    else:
+        print("[INFO] Computing camera positions offset to the left of motion...")
+        df_with_camera = compute_camera_positions(gps_file=df_gps, offset_m=args.offset_m, kinematics=kinematics)
+    return {"df_with_camera": df_with_camera}
+
+
+# Step 5: merge direction + camera
+def stage_merge(args, df_with_direction, df_with_camera):
+    print("[INFO] Merging direction and camera position into one DataFrame...")
+    if args.camera_rig_file:
+        df_combined = df_with_camera.copy()
+        direction = df_with_direction.set_index("Image_ID")["Direction"]
+        df_combined.insert(list(df_with_direction.columns).index("Direction"), "Direction",
+                           df_combined["Image_ID"].map(direction).to_numpy())
+    else:
+        df_combined = df_with_direction.copy()
+        df_combined["Camera_Long"] = df_with_camera["Camera_Long"]
+        df_combined["Camera_Lat"] = df_with_camera["Camera_Lat"]
+    print("[Preview] Combined DataFrame (direction + camera):")
+    print(df_combined.head())
+    return {"df_combined": df_combined}
+
+
+# Step 6: assign row to each camera point
+def stage_assign_rows(args, df_combined):
+    print("[INFO] Assigning nearest row to each camera position...")
+    if args.engine == "reference":
+        from utils.referenceEngine import assign_image_rows_reference
+        df_assigned = assign_image_rows_reference(df_combined, args.row_file)
+    else:
+        df_assigned = assign_image_rows(df_combined, args.row_file)
+    print("[Preview] Combined DataFrame with Assigned_Row:")
+    print(df_assigned.head())
+    return {"df_assigned": df_assigned}
+
+
+# Step 6b: segment the trajectory into row passes
+def stage_row_passes(args, df_assigned, df_last):
+    print("[INFO] Segmenting trajectory into row passes...")
+    df_passes, pass_ids = segment_row_passes(df_assigned, max_id_gap=args.pass_max_id_gap, min_run_length=args.pass_min_images)
+    if df_last is not None:
+        df_passes, pass_ids = continue_pass_ids(df_passes, pass_ids, df_assigned, df_last)
+    df_with_passes = df_assigned.copy()
+    df_with_passes["Pass_ID"] = pass_ids
+    print(f"[INFO] Found {len(df_passes)} row passes.")
+    return {"df_passes": df_passes, "df_with_passes": df_with_passes}
+
+
+def stage_write_row_passes(args, df_passes, df_last, log_offset):
+    if df_last is not None:
+        df_passes = merge_row_passes(df_passes, args.row_passes_output_path, log_offset)
+    df_passes.to_csv(args.row_passes_output_path, index=False)
+    print(f"[INFO] Row passes saved to {args.row_passes_output_path}")
+
+
+# Step 6c: group frames captured while the robot stood still
+def stage_stationary(args, df_gps, kinematics, df_last):
+    print("[INFO] Grouping stationary / duplicate frames...")
+    group_ids, is_representative, df_groups = group_stationary_frames(
+        df_gps, kinematics, max_step_m=args.stationary_max_step, max_radius_m=args.stationary_radius,
+        max_time_gap_s=args.stationary_max_gap_s
+    )
+    if df_last is not None:
+        # the groups are written as a whole: join them to the table of the previous runs
+        is_representative, df_groups = continue_stationary_groups(
+            df_gps, group_ids, is_representative, df_groups, df_last, args.stationary_output_path
+        )
+    print(f"[INFO] Found {len(df_groups)} stationary groups holding {int(df_groups['Num_Frames'].sum()) - len(df_groups)} duplicate frames.")
+    return {"df_stationary_groups": df_groups, "representative_ids": df_gps["Image_ID"].to_numpy()[is_representative]}
+
+
+def stage_write_stationary(args, df_stationary_groups):
+    df_stationary_groups.to_csv(args.stationary_output_path, index=False)
+    print(f"[INFO] Stationary groups saved to {args.stationary_output_path}")
+
+
+# Step 7: optionally visualize direction + camera layout
+def stage_plot_camera(args, df_with_passes):
+    print("[INFO] Visualizing camera positions with direction and rows...")
+    from utils.plotData import plot_camera_with_direction
+    plot_camera_with_direction(df_with_passes, args.row_file)
+
+
+# Step 8: optionally visualize Assigned_Row with colored camera points
+def stage_plot_assigned_row(args, df_with_passes):
+    print("[INFO] Visualizing camera points colored by assigned row...")
+    from utils.plotData import plot_camera_by_assigned_row
+    plot_camera_by_assigned_row(df_with_passes, args.row_file)
+
+
+def fov_axes(args, df, kinematics):
+    # optical axis and FOV of every record: per camera with a rig, left of the motion otherwise
+    if args.camera_rig_file:
+        return df["Camera_Axis_East"], df["Camera_Axis_North"], df["Camera_FOV_deg"]
+    axis_east, axis_north = camera_axes_from_kinematics(kinematics)
+    return axis_east, axis_north, args.cam_fov_degree
+
+
+def run_parallel(args):
+    return args.workers > 1 and args.engine == "fast"
+
+
+# Step 9: compute FOV projection and intersections
+# (with --workers > 1 this also matches the vines, sharded across processes)
+def stage_fov(args, df_with_passes, kinematics, coverage_file=None, df_stationary_groups=None, representative_ids=None):
+    if representative_ids is not None:
+        # only the representative of each stationary group goes through FOV and matching
+        if not args.camera_rig_file:
+            kinematics = kinematics[df_with_passes["Image_ID"].isin(representative_ids).to_numpy()].reset_index(drop=True)
+        num_before = len(df_with_passes)
+        df_with_passes = collapse_stationary_frames(df_with_passes, representative_ids, df_stationary_groups)
+        print(f"[INFO] Collapsed stationary frames: {num_before} -> {len(df_with_passes)} records.")
+    if args.engine == "reference":
+        print("[INFO] Computing FOV projection intersections (reference engine)...")
+        from utils.referenceEngine import fov_intersections_reference
+        axis_east, axis_north, fov_deg = fov_axes(args, df_with_passes, kinematics)
+        df_fov = fov_intersections_reference(df_with_passes, args.row_file, axis_east, axis_north, fov_deg)
+    elif run_parallel(args):
+        print(f"[INFO] Computing FOV projection intersections and vine matching on {args.workers} workers (sharded by {args.shard_by})...")
+        from utils.parallelRows import compute_fov_and_match_parallel
+        axis_east, axis_north, fov_deg = fov_axes(args, df_with_passes, kinematics)
+        df_fov = compute_fov_and_match_parallel(
+            df_with_passes, args.row_file, coverage_file, axis_east, axis_north, fov_deg,
+            workers=args.workers, shard_by="Pass_ID" if args.shard_by == "pass" else "Assigned_Row"
+        )
+    elif args.camera_rig_file:
+        print("[INFO] Computing FOV projection intersections...")
+        df_fov = compute_rig_fov_intersections(df_with_passes.copy(), args.row_file)
+    else:
+        print("[INFO] Computing FOV projection intersections...")
+        df_fov = compute_fov_intersections(df_with_passes.copy(), args.row_file, fov_deg=args.cam_fov_degree, kinematics=kinematics)
+    print("[Preview] Combined DataFrame with FOV intersection points:")
+    print(df_fov[["Image_ID", "FOV_Center_Long", "FOV_Left_Long", "FOV_Right_Long"]].head())
+    return {"df_fov": df_fov}
+
+
+# Step 10: optional FOV projection visualization
+def stage_plot_fov(args, df_fov):
+    print(f"[INFO] Visualizing {args.fov_samples} random FOV projection samples...")
+    from utils.plotData import plot_random_fov_projection
+    plot_random_fov_projection(df_fov, args.row_file, num_samples=args.fov_samples)
+
+
+def stream_final_output(args, df_last):
+    # matched chunks go straight to the background writer of Step 12 when the whole
+    # pipeline runs in this process and the output is rewritten (not appended)
+    return df_last is None and not args.stage and args.stage_executor == "thread"
+
+
+# Step 11: match covered vines based on projected FOV range
+def stage_match(args, df_fov, coverage_file, df_last):
+    writer = None
+    if "Covered_Vines" in df_fov.columns:
+        df_matched = df_fov
+    elif args.engine == "reference":
+        print("[INFO] Matching grapevine coverage with camera FOV (reference engine)...")
+        from utils.referenceEngine import match_vines_in_fov_reference
+        df_matched = match_vines_in_fov_reference(df_fov, args.row_file, coverage_file)
+    elif stream_final_output(args, df_last):
+        print(f"[INFO] Matching grapevine coverage with camera FOV, streaming {args.write_chunk_rows}-record chunks to {args.final_output_path}...")
+        writer = AsyncCsvWriter(args.final_output_path, queue_size=args.write_queue_size, process=args.writer_process)
+        try:
+            df_matched = match_vines_in_fov(df_fov, args.row_file, coverage_file,
+                                            chunk_rows=args.write_chunk_rows, on_chunk=writer.write)
+        except BaseException:
+            writer.abort()
+            raise
+    else:
+        print("[INFO] Matching grapevine coverage with camera FOV...")
+        df_matched = match_vines_in_fov(df_fov, args.row_file, coverage_file)
+    print("[Preview] Combined DataFrame with Covered_Vines:")
+    print(df_matched[["Image_ID", "Covered_Vines"]].head())
+    return {"df_matched": df_matched, "output_writer": writer}
+
+
+# Step 12: save final output (finishing the chunks streamed by Step 11, if any)
+def stage_write_output(args, df_matched, df_last, output_writer):
+    if output_writer is not None:
+        output_writer.close()
+        print(f"[INFO] Final output saved to {args.final_output_path}")
+    elif df_last is None:
+        write_csv(df_matched, args.final_output_path, chunk_rows=args.write_chunk_rows,
+                  queue_size=args.write_queue_size, process=args.writer_process)
+        print(f"[INFO] Final output saved to {args.final_output_path}")
+    else:
+        df_write, num_replaced = records_to_write(df_matched, df_last)
+        replace_last_records(df_write, args.final_output_path, num_replaced)
+        print(f"[INFO] Rewrote {num_replaced} and appended {len(df_write) - num_replaced} records in {args.final_output_path}")
+    return {"final_output": args.final_output_path}
+
+
+# Step 12b: optional indexed SQLite store of images, vines, coverage and image-vine pairs
+def stage_write_sqlite(args, df_matched, coverage_file, df_last):
+    from utils.sqliteStore import write_sqlite_store
+    df_write, _ = records_to_write(df_matched, df_last)
+    write_sqlite_store(args.sqlite_output_path, df_write, pd.read_csv(coverage_file), append=df_last is not None,
+                       replace_from_id=None if df_last is None else df_last["Image_ID"].iloc[0])
+    return {"sqlite_output": args.sqlite_output_path}
+
+
+# Step 12c: optional memory-mapped result bundle for the viewers
+def stage_write_bundle(args, df_matched, coverage_file, df_last, final_output):
+    from utils.resultBundle import write_result_bundle
+    # an incremental run only holds the new records: rebuild from the whole output
+    df_all = df_matched if df_last is None else pd.read_csv(final_output)
+    write_result_bundle(args.bundle_output_path, df_all, pd.read_csv(coverage_file))
+
+
+# Step 12d: optional reduced image list covering every vine at least k times
+def stage_select_subset(args, final_output, coverage_file):
+    print(f"[INFO] Selecting a minimal image subset covering every vine {args.subset_k} times...")
+    from utils.getImageSubset import select_image_subset
+    df_selected = select_image_subset(pd.read_csv(final_output), args.row_file, coverage_file, k=args.subset_k)
+    df_selected.to_csv(args.subset_output_path, index=False)
+    print(f"[INFO] Image subset saved to {args.subset_output_path}")
+
+
+# Step 12e: optional per-row report of uncovered stretches, overlap depth and under-seen vines
+def stage_coverage_gaps(args, final_output, coverage_file):
+    from utils.getCoverageGaps import compute_coverage_gaps
+    df_report = compute_coverage_gaps(pd.read_csv(final_output), args.row_file, coverage_file,
+                                      k=args.gap_k, min_gap_m=args.gap_min_length)
+    df_report.to_csv(args.gap_report_output_path, index=False)
+    print(f"[INFO] {int(df_report['Num_Gaps'].sum())} coverage gaps over {len(df_report)} rows, "
+          f"{(df_report['Vines_Under_K'] != '').sum()} rows with vines seen fewer than {args.gap_k} times")
+    print(f"[INFO] Coverage gap report saved to {args.gap_report_output_path}")
+
+
+# Step 12f: optional pixel column range of every matched vine in every image
+def stage_pixel_spans(args, final_output, coverage_file):
+    from utils.getVinePixelSpans import compute_vine_pixel_spans
+    df_spans = compute_vine_pixel_spans(pd.read_csv(final_output), args.row_file, coverage_file, args.image_width)
+    df_spans.to_csv(args.pixel_spans_output_path, index=False)
+    print(f"[INFO] Pixel spans of {len(df_spans)} image-vine pairs saved to {args.pixel_spans_output_path}")
+
+
+# Optional annotation of other geotagged streams (point or span events) with rows and vines
+def stage_annotate_events(args, coverage_file):
+    print(f"[INFO] Annotating events in {args.events_file} with rows and vines...")
+    from utils.getEventAnnotations import EventAnnotator
+    annotator = EventAnnotator(args.row_file, coverage_file, max_row_distance_m=args.event_max_row_distance)
+    df_events = annotator.annotate(pd.read_csv(args.events_file), end_columns=args.event_span_columns)
+    df_events.to_csv(args.events_output_path, index=False)
+    print(f"[INFO] {int((df_events['Assigned_Row'] >= 0).sum())} of {len(df_events)} events assigned to a row")
+    print(f"[INFO] Annotated events saved to {args.events_output_path}")
+
+
+# Optional preview: FOV and matching on progressively denser per-pass samples, with summary metrics
+def stage_preview(args, df_with_passes, kinematics, coverage_file):
+    print(f"[INFO] Preview on per-pass samples with strides {args.preview_strides}...")
+    from utils.previewRun import run_preview
+    axis_east, axis_north, fov_deg = fov_axes(args, df_with_passes, kinematics)
+    df_report = run_preview(df_with_passes, args.row_file, coverage_file, axis_east, axis_north, fov_deg,
+                            strides=args.preview_strides, output_path=args.preview_output_path)
+    if args.preview_output_path:
+        print(f"[INFO] Preview metrics saved to {args.preview_output_path}")
+    return {"preview_report": df_report}
+
+
+# Optional differential check of the fast engine against the reference loops
+def stage_verify(args, df_combined, kinematics, coverage_file):
+    scope = f"{args.verify_sample} sampled" if 0 < args.verify_sample < len(df_combined) else "all"
+    print(f"[INFO] Verifying fast vs. reference engine on {scope} records...")
+    from utils.referenceEngine import verify_engines
+    axis_east, axis_north, fov_deg = fov_axes(args, df_combined, kinematics)
+    report = verify_engines(df_combined, args.row_file, coverage_file, axis_east, axis_north, fov_deg,
+                            sample=args.verify_sample)
+    print(f"[VERIFY] Records compared:            {report['records']}")
+    print(f"[VERIFY] Assigned_Row mismatches:     {report['assigned_row_mismatches']}")
+    print(f"[VERIFY] FOV missing in only one:     {report['fov_nan_mismatches']}")
+    print(f"[VERIFY] Max coordinate deviation:    {report['max_coordinate_deviation_deg']:.3e} deg ({report['max_coordinate_deviation_m']:.3e} m)")
+    print(f"[VERIFY] Covered_Vines mismatches:    {report['covered_vines_mismatches']}")
+    if report["mismatched_image_ids"]:
+        print(f"[VERIFY] Mismatched Image_IDs:        {report['mismatched_image_ids'][:20]}")
+    print(f"[VERIFY] Fast {report['fast_s']:.3f} s, reference {report['reference_s']:.3f} s "
+          f"(speedup x{report['reference_s'] / max(report['fast_s'], 1e-9):.1f})")
+    return {"verify_report": report}
+
+
+# Step 13: optional visualization of vine-camera match results
+def stage_plot_matched_vines(args, final_output, coverage_file):
+    print(f"[INFO] Visualizing {args.visualize_vine_cam} vine-camera coverage samples...")
+    from utils.plotData import visualize_matched_vines
+    visualize_matched_vines(final_output, coverage_file, args.row_file, num_samples=args.visualize_vine_cam)
+
+
+def build_stages(args):
+    """
+    The pipeline as a DAG of stages with declared inputs and outputs.
+    Optional stages are only included when their option is set.
+    """
+    track = ["gps_track"] if args.gps_track_file else []
+    stages = [
+        Stage("coverage", stage_vine_coverage, outputs=["coverage_file"], description="Grapevine coverage intervals (Step 0)"),
+        Stage("gps", stage_gps, track, ["df_gps", "df_last", "log_offset"], description="Read the image GPS log (new tail only with --incremental)"),
+        Stage("kinematics", stage_kinematics, ["df_gps"] + track, ["kinematics"], description="Shared motion vectors, heading and speed"),
+        Stage("direction", stage_direction, ["df_gps", "kinematics"], ["df_with_direction"], description="Movement direction F/B"),
+        Stage("camera", stage_camera, ["df_gps", "kinematics"], ["df_with_camera"], description="Camera positions (single camera or rig)"),
+        Stage("merge", stage_merge, ["df_with_direction", "df_with_camera"], ["df_combined"], description="Merge direction and camera positions"),
+        Stage("assign_rows", stage_assign_rows, ["df_combined"], ["df_assigned"], description="Nearest row per camera position"),
+        Stage("row_passes", stage_row_passes, ["df_assigned", "df_last"], ["df_passes", "df_with_passes"], description="Segment trajectory into row passes"),
+        Stage("fov", stage_fov, ["df_with_passes", "kinematics"] + (["coverage_file"] if run_parallel(args) else [])
+              + (["df_stationary_groups", "representative_ids"] if args.collapse_stationary else []), ["df_fov"], description="FOV intersections with the assigned row"),
+        Stage("match", stage_match, ["df_fov", "coverage_file", "df_last"], ["df_matched", "output_writer"], description="Vines covered by each FOV"),
+        Stage("write_output", stage_write_output, ["df_matched", "df_last", "output_writer"], ["final_output"], description="Write the final CSV (Step 12)"),
+    ]
+    if args.gps_track_file:
+        stages.append(Stage("track", stage_track, outputs=["gps_track"], description="Load the GPS track for pose interpolation"))
+    if args.row_passes_output_path:
+        stages.append(Stage("write_row_passes", stage_write_row_passes, ["df_passes", "df_last", "log_offset"], description="Write the row pass table"))
+    if args.sqlite_output_path:
+        stages.append(Stage("write_sqlite", stage_write_sqlite, ["df_matched", "coverage_file", "df_last"], ["sqlite_output"], description="Write the indexed SQLite store"))
+    if args.verify:
+        stages.append(Stage("verify", stage_verify, ["df_combined", "kinematics", "coverage_file"], ["verify_report"], description="Compare fast and reference engines"))
+    if args.stationary_output_path or args.collapse_stationary:
+        stages.append(Stage("stationary", stage_stationary, ["df_gps", "kinematics", "df_last"], ["df_stationary_groups", "representative_ids"], description="Group stationary / duplicate frames"))
+    if args.stationary_output_path:
+        stages.append(Stage("write_stationary", stage_write_stationary, ["df_stationary_groups"], description="Write the stationary frame groups"))
+    if args.bundle_output_path:
+        stages.append(Stage("write_bundle", stage_write_bundle, ["df_matched", "coverage_file", "df_last", "final_output"], description="Write the memory-mapped result bundle"))
+    if args.subset_output_path:
+        stages.append(Stage("select_subset", stage_select_subset, ["final_output", "coverage_file"], description="Minimal image subset covering every vine k times"))
+    if args.gap_report_output_path:
+        stages.append(Stage("coverage_gaps", stage_coverage_gaps, ["final_output", "coverage_file"], description="Per-row coverage gap report"))
+    if args.pixel_spans_output_path:
+        stages.append(Stage("pixel_spans", stage_pixel_spans, ["final_output", "coverage_file"], description="Pixel column span of each matched vine"))
+    if args.events_file:
+        stages.append(Stage("annotate_events", stage_annotate_events, ["coverage_file"], description="Annotate geotagged events with rows and vines"))
+    if args.preview:
+        stages.append(Stage("preview", stage_preview, ["df_with_passes", "kinematics", "coverage_file"], ["preview_report"], description="Progressive sampled preview with summary metrics"))
+    if args.check_raw_data:
+        stages.append(Stage("plot_raw_data", stage_plot_raw_data, main_thread=True, description="Plot raw data"))
+    if args.check_direction:
+        stages.append(Stage("plot_direction", stage_plot_direction, ["df_with_direction"], main_thread=True, description="Plot direction"))
+    if args.check_camera:
+        stages.append(Stage("plot_camera", stage_plot_camera, ["df_with_passes"], main_thread=True, description="Plot camera positions"))
+    if args.check_assigned_row:
+        stages.append(Stage("plot_assigned_row", stage_plot_assigned_row, ["df_with_passes"], main_thread=True, description="Plot assigned rows"))
+    if args.fov_samples > 0:
+        stages.append(Stage("plot_fov", stage_plot_fov, ["df_fov"], main_thread=True, description="Plot FOV samples"))
+    if args.visualize_vine_cam > 0:
+        stages.append(Stage("plot_matched_vines", stage_plot_matched_vines, ["final_output", "coverage_file"], main_thread=True, description="Plot matched vines"))
+    return stages
+
 
 def main():
     """
-    Main pipeline entry.
+    Main pipeline entry. The steps are declared as a DAG of stages (see build_stages)
+    and independent ones (e.g. coverage, direction, camera positions, output writing
+    and plots) run concurrently with --jobs > 1.
     Step 0: compute grapevine coverage region
     Step 1: movement direction (F/B)
     Step 2: camera position offset to left
     Step 3: assign each camera to closest row
     Step 4: compute FOV intersections on row
     Step 5: match covered vines based on FOV
+    With --camera_rig_file, Steps 2-4 run once for all cameras of the rig and the
+    output is keyed by (Image_ID, Camera).
+    Before any stage runs, the row, grapevine and image GPS files are validated
+    (skip with --skip_validation).
+    With --stage NAME only that stage and its prerequisites run.
+    With --preview only a sampled, progressively refined run with summary metrics is made.
+    With --incremental only records newer than the last Image_ID of the final output
+    (plus the records back to the last one that moved, as context) are processed and appended.
     Optionally visualize:
       --check_raw_data: visual inspection of raw layout
       --check_direction: movement direction check
@@ -47,123 +493,102 @@ def main():
     parser.add_argument("--row_file", type=str, default="Data/OBlock/Row_SE_GPS_OBlock.csv", help="Path to row start/end file.")
     parser.add_argument("--grapevine_coverage_file_output_path", type=str, default="Data/OBlock/Grapevines_with_Coverage.csv", help="Output path for computed grapevine coverage file.")
     parser.add_argument("--final_output_path", type=str, default="Data/OBlock/Image_GPS_FOV_matched_vines.csv", help="Final CSV output path.")
+    parser.add_argument("--gps_track_file", type=str, default=None, help="Optional GPS track CSV (time, Latitude, Longitude); image positions and headings are interpolated from it at the image times.")
+    parser.add_argument("--track_time_column", type=str, default="ROS_Time_Stamp", help="Time column of --gps_track_file.")
+    parser.add_argument("--image_time_column", type=str, default="ROS_Time_Stamp", help="Time column of the image log used for pose interpolation (same unit as the track time).")
     parser.add_argument("--offset_m", type=float, default=0.76, help="Camera offset distance (meters) from GPS receiver.")
     parser.add_argument("--cam_fov_degree", type=float, default=60.5, help="Camera field of view (degrees).")
+    parser.add_argument("--camera_rig_file", type=str, default=None, help="Optional camera rig CSV (Camera, Lateral_Offset_m, Longitudinal_Offset_m, Yaw_deg, FOV_deg). Overrides --offset_m and --cam_fov_degree.")
+    parser.add_argument("--row_passes_output_path", type=str, default=None, help="Optional output path for the row pass table (start/end index, row, direction).")
+    parser.add_argument("--sqlite_output_path", type=str, default=None, help="Optional SQLite database (.db) with indexed images, vines, coverage and image-vine pairs.")
+    parser.add_argument("--bundle_output_path", type=str, default=None, help="Optional directory for a memory-mapped result bundle (.npy arrays) opened instantly by the viewers.")
+    parser.add_argument("--subset_output_path", type=str, default=None, help="Optional CSV with a near-minimal image subset in which every vine is seen --subset_k times.")
+    parser.add_argument("--subset_k", type=int, default=2, help="Number of views per vine kept by --subset_output_path.")
+    parser.add_argument("--gap_report_output_path", type=str, default=None, help="Optional CSV with one line per row: uncovered stretches, FOV overlap depth and vines seen fewer than --gap_k times.")
+    parser.add_argument("--gap_k", type=int, default=2, help="Vines seen by fewer images than this are listed by --gap_report_output_path.")
+    parser.add_argument("--gap_min_length", type=float, default=0.1, help="Uncovered stretches shorter than this (meters) are not reported as gaps.")
+    parser.add_argument("--pixel_spans_output_path", type=str, default=None, help="Optional CSV with one line per (image, vine) pair and the pixel columns [Pixel_Start, Pixel_End) the vine occupies.")
+    parser.add_argument("--image_width", type=int, default=2048, help="Image width in pixels used by --pixel_spans_output_path.")
+    parser.add_argument("--events_file", type=str, default=None, help="Optional CSV of other geotagged events (Latitude, Longitude, any other columns) to annotate with their row and vine.")
+    parser.add_argument("--events_output_path", type=str, default="Data/OBlock/Events_annotated.csv", help="Output path for the annotated --events_file.")
+    parser.add_argument("--event_span_columns", type=str, nargs=2, default=None, metavar=("END_LAT", "END_LON"), help="End latitude/longitude columns of --events_file for span events (Latitude/Longitude being the start).")
+    parser.add_argument("--event_max_row_distance", type=float, default=None, help="Events farther than this (meters) from their nearest row get Assigned_Row -1.")
+    parser.add_argument("--stationary_output_path", type=str, default=None, help="Optional CSV with groups of frames captured at the same position (representative + duplicates).")
+    parser.add_argument("--collapse_stationary", action="store_true", help="Keep only the representative frame of each stationary group in the output (duplicates listed in Duplicate_Image_IDs).")
+    parser.add_argument("--stationary_max_step", type=float, default=0.05, help="Largest step (meters) between consecutive frames of a stationary group.")
+    parser.add_argument("--stationary_radius", type=float, default=0.25, help="A stationary group is split every this many meters of travelled path.")
+    parser.add_argument("--stationary_max_gap_s", type=float, default=5.0, help="Largest time step (seconds) between consecutive frames of a stationary group.")
+    parser.add_argument("--pass_min_images", type=int, default=5, help="Row/direction flicker shorter than this many frames is absorbed into the surrounding pass.")
+    parser.add_argument("--pass_max_id_gap", type=int, default=1, help="Largest Image_ID step still considered the same row pass.")
+    parser.add_argument("--workers", type=int, default=1, help="If > 1, compute FOV intersections and vine matching on this many worker processes.")
+    parser.add_argument("--shard_by", type=str, choices=["row", "pass"], default="row", help="Shard images across workers by assigned row or by row pass.")
+    parser.add_argument("--incremental", action="store_true", help="Only process records whose Image_ID is newer than the last one in --final_output_path and append them; vine coverage is reused unless the vine or row file changed.")
+    parser.add_argument("--engine", type=str, choices=["fast", "reference"], default="fast", help="Geometry implementation: array code (fast) or the per-record loops (reference).")
+    parser.add_argument("--verify", action="store_true", help="Also run both engines on the same records and report deviations, mismatches and speedup.")
+    parser.add_argument("--verify_sample", type=int, default=0, help="Number of random records compared by --verify (0 = all).")
+    parser.add_argument("--skip_validation", action="store_true", help="Skip the up-front checks of the row, grapevine and image GPS files.")
+    parser.add_argument("--preview", action="store_true", help="Only run a quick preview: FOV and matching on progressively denser per-pass samples, printing summary metrics after each level (no final output).")
+    parser.add_argument("--preview_strides", type=int, nargs="+", default=[64, 16, 4, 1], help="Decreasing sampling strides of the preview levels (1 = every frame).")
+    parser.add_argument("--preview_output_path", type=str, default=None, help="Optional CSV the preview metrics are appended to after every level.")
+    parser.add_argument("--write_chunk_rows", type=int, default=100000, help="Records per chunk handed to the background CSV writer of the final output.")
+    parser.add_argument("--write_queue_size", type=int, default=4, help="Chunks the background CSV writer may hold before the producer waits.")
+    parser.add_argument("--writer_process", action="store_true", help="Format the final CSV in a separate writer process (overlaps formatting with compute on multi-core machines; ~1 s startup).")
     parser.add_argument("--extend_first_last", type=float, default=0.5, help="Extension distance for first/last vine.")
     parser.add_argument("--extend_not_continuous", type=float, default=1.0, help="Extension distance for non-continuous vine IDs.")
     parser.add_argument("--max_half_extend", type=float, default=1.2, help="Maximum half-distance between continuous vines.")
 
-    args = parser.parse_args()
-
-    # Paths and configuration from args
-    grapevines_file = args.grapevines_file
-    image_gps_file = args.image_gps_file
-    row_file = args.row_file
-    grapevine_coverage_file_output_path = args.grapevine_coverage_file_output_path
-    final_output_path = args.final_output_path
-
-    offset_m = args.offset_m
-    cam_fov_degree = args.cam_fov_degree
-    extend_first_last = args.extend_first_last
-    extend_not_continuous = args.extend_not_continuous
-    max_half_extend = args.max_half_extend
-
-    # Step 0: compute grapevine coverage and save to grapevine_coverage_file_output_path
-    print("[INFO] Step 0: Computing grapevine coverage region...")
-    compute_vine_coverage_variable(
-        row_file=row_file,
-        vine_file=grapevines_file,
-        out_path=grapevine_coverage_file_output_path,
-        extend_first_last=extend_first_last,
-        extend_not_continuous=extend_not_continuous,
-        max_half_extend=max_half_extend
-    )
+    # Stage scheduling
+    parser.add_argument("--jobs", type=int, default=4, help="Number of independent stages allowed to run concurrently (1 = strictly sequential).")
+    parser.add_argument("--stage_executor", type=str, choices=["thread", "process"], default="thread", help="Pool used to run concurrent stages.")
+    parser.add_argument("--stage", type=str, action="append", default=None, help="Run only this stage and its prerequisites (repeatable).")
+    parser.add_argument("--list_stages", action="store_true", help="List the pipeline stages and exit.")
 
-    # Step 1: optionally visualize raw data
-    if args.check_raw_data:
-        print("[INFO] Visualizing raw data for debugging/inspection...")
-        plot_all_raw_data(grapevines_file, image_gps_file, row_file)
-    else:
-        print("[INFO] Skipping raw data visualization step...")
-
-    # Step 2: compute movement direction
-    print("[INFO] Computing movement direction classification (F/B)...")
-    df_with_direction = compute_moving_direction(gps_file=image_gps_file, row_file=row_file)
-    print("[Preview] First rows with direction:")
-    print(df_with_direction.head())
-
-    # Step 3: optionally visualize direction
-    if args.check_direction:
-        print("[INFO] Visualizing GPS points by movement direction (F/B)...")
-        plot_direction_figure(df_with_direction, row_file)
-    else:
-        print("[INFO] Skipping direction classification visualization.")
-
-    # Step 4: compute camera position
-    print("[INFO] Computing camera positions offset to the left of motion...")
-    df_with_camera = compute_camera_positions(gps_file=image_gps_file, offset_m=offset_m)
-
-    # Step 5: merge direction + camera
-    print("[INFO] Merging direction and camera position into one DataFrame...")
-    df_combined = df_with_direction.copy()
-    df_combined["Camera_Long"] = df_with_camera["Camera_Long"]
-    df_combined["Camera_Lat"] = df_with_camera["Camera_Lat"]
-
-    del df_with_direction, df_with_camera
-    gc.collect()
-
-    print("[Preview] Combined DataFrame (direction + camera):")
-    print(df_combined.head())
-
-    # Step 6: assign row to each camera point
-    print("[INFO] Assigning nearest row to each camera position...")
-    df_combined = assign_image_rows(df_combined, row_file)
-    print("[Preview] Combined DataFrame with Assigned_Row:")
-    print(df_combined.head())
-
-    # Step 7: optionally visualize direction + camera layout
-    if args.check_camera:
-        print("[INFO] Visualizing camera positions with direction and rows...")
-        plot_camera_with_direction(df_combined, row_file)
-    else:
-        print("[INFO] Skipping camera visualization.")
-
-    # Step 8: optionally visualize Assigned_Row with colored camera points
-    if args.check_assigned_row:
-        print("[INFO] Visualizing camera points colored by assigned row...")
-        plot_camera_by_assigned_row(df_combined, row_file)
-    else:
-        print("[INFO] Skipping Assigned_Row visualization.")
-
-    # Step 9: compute FOV projection and intersections
-    print("[INFO] Computing FOV projection intersections...")
-    df_combined = compute_fov_intersections(df_combined, row_file, fov_deg=cam_fov_degree)
-    print("[Preview] Combined DataFrame with FOV intersection points:")
-    print(df_combined[["Image_ID", "FOV_Center_Long", "FOV_Left_Long", "FOV_Right_Long"]].head())
+    args = parser.parse_args()
+    if args.incremental and args.final_output_path.endswith(".gz"):
+        parser.error("--incremental appends to --final_output_path, which needs an uncompressed CSV.")
+    if args.preview and not args.stage:
+        outputs = {"--row_passes_output_path": args.row_passes_output_path, "--sqlite_output_path": args.sqlite_output_path,
+                   "--bundle_output_path": args.bundle_output_path, "--subset_output_path": args.subset_output_path,
+                   "--gap_report_output_path": args.gap_report_output_path, "--pixel_spans_output_path": args.pixel_spans_output_path,
+                   "--stationary_output_path": args.stationary_output_path, "--events_file": args.events_file}
+        skipped = [flag for flag, value in outputs.items() if value]
+        if skipped:
+            parser.error(f"--preview writes no other output, so {', '.join(skipped)} would be skipped; "
+                         "run them without --preview, or list the stages to run with --stage.")
 
-    # Step 10: optional FOV projection visualization
-    if args.fov_samples > 0:
-        print(f"[INFO] Visualizing {args.fov_samples} random FOV projection samples...")
-        plot_random_fov_projection(df_combined, row_file, num_samples=args.fov_samples)
-    else:
-        print("[INFO] Skipping FOV projection visualization.")
+    stages = build_stages(args)
+    if args.list_stages:
+        for s in stages:
+            deps = ", ".join(s.inputs) if s.inputs else "-"
+            print(f"{s.name:20s} {s.description}  [needs: {deps}]")
+        return
 
-    # Step 11: match covered vines based on projected FOV range
-    print("[INFO] Matching grapevine coverage with camera FOV...")
-    df_combined = match_vines_in_fov(df_combined, row_file, grapevine_coverage_file_output_path)
-    print("[Preview] Combined DataFrame with Covered_Vines:")
-    print(df_combined[["Image_ID", "Covered_Vines"]].head())
+    # a preview stops after the sampled levels unless other stages are requested explicitly
+    targets = args.stage or (["preview"] if args.preview else None)
+    selected = resolve_stages(stages, targets)
+    if not args.skip_validation:
+        # fail fast on malformed inputs, checking only the files the selected stages read
+        from utils.inputValidation import validate_inputs
+        raw = "plot_raw_data" in selected
+        elapsed = validate_inputs(
+            row_file=args.row_file,
+            vine_file=args.grapevines_file if "coverage" in selected or raw else None,
+            image_gps_file=args.image_gps_file if "gps" in selected or raw else None,
+            time_column=args.image_time_column
+        )
+        print(f"[INFO] Input files validated in {elapsed * 1000:.0f} ms")
 
-    # Step 12: save final output
-    df_combined.to_csv(final_output_path, index=False)
-    print(f"[INFO] Final output saved to {final_output_path}")
+    if args.incremental:
+        df_ids = pd.read_csv(args.image_gps_file, usecols=["Image_ID", "Latitude", "Longitude"])
+        df_ids = df_ids.sort_values(by="Image_ID").reset_index(drop=True)
+        df_run, df_last = plan_incremental_run(df_ids, args.final_output_path, incremental_inputs(args))
+        if df_last is not None and df_run.empty:
+            print(f"[INFO] No new records after Image_ID {df_last['Image_ID'].iloc[0]}; {args.final_output_path} is up to date.")
+            return
 
-    # Step 13: optional visualization of vine-camera match results
-    if args.visualize_vine_cam > 0:
-        print(f"[INFO] Visualizing {args.visualize_vine_cam} vine-camera coverage samples...")
-        visualize_matched_vines(final_output_path, grapevine_coverage_file_output_path, row_file, num_samples=args.visualize_vine_cam)
-    else:
-        print("[INFO] Skipping vine-camera match visualization.")
+    if targets:
+        print(f"[INFO] Running stages: {[s.name for s in stages if s.name in selected]}")
+    run_stages(stages, args, targets=targets, jobs=args.jobs, executor=args.stage_executor)
 
 if __name__ == "__main__":
     main()
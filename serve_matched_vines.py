@@ -0,0 +1,24 @@
+import argparse
+import time
+from utils.matchQuery import MatchIndex, serve_match_index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local query service over matched images and vines.")
+    parser.add_argument("--matched_file", type=str, default="Data/OBlock/Image_GPS_FOV_matched_vines.csv", help="Matcher output CSV.")
+    parser.add_argument("--row_file", type=str, default="Data/OBlock/Row_SE_GPS_OBlock.csv", help="Path to row start/end file.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind (localhost by default).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = MatchIndex.from_csv(args.matched_file, args.row_file)
+    print(f"[INFO] Indexed {len(index.image_ids)} images and {len(index.vine_to_images)} vines in {time.perf_counter() - t0:.2f} s")
+
+    server = serve_match_index(index, args.host, args.port)
+    print(f"[INFO] Serving on http://{args.host}:{args.port} (/vine?row=&id=, /image?image_id=, /range?row=&start=&end=)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] Stopping query service.")
+    finally:
+        server.server_close()
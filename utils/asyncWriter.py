@@ -0,0 +1,147 @@
+import gzip
+import os
+import queue
+import threading
+
+
+def _write_chunks(chunks, tmp_path, compress):
+    """
+    Writer loop: appends DataFrame chunks taken from `chunks` to tmp_path until None.
+    After an error the remaining chunks are still consumed, so the producer is never
+    left blocked on a full queue.
+
+    Returns:
+        (num_rows, error)
+    """
+    num_rows = 0
+    try:
+        opener = gzip.open if compress else open
+        with opener(tmp_path, "wt", newline="") as f:
+            header = True
+            while True:
+                df = chunks.get()
+                if df is None:
+                    return num_rows, None
+                df.to_csv(f, header=header, index=False)
+                header = False
+                num_rows += len(df)
+    except Exception as e:
+        while chunks.get() is not None:
+            pass
+        return num_rows, e
+
+
+def _writer_process(chunks, results, tmp_path, compress):
+    num_rows, error = _write_chunks(chunks, tmp_path, compress)
+    results.put((num_rows, None if error is None else f"{type(error).__name__}: {error}"))
+
+
+class AsyncCsvWriter:
+    """
+    Writes DataFrame chunks to a CSV in the background, so formatting and disk I/O of
+    one chunk overlap with computing the next one.
+
+    - write() blocks while queue_size chunks are waiting (backpressure: a fast producer
+      cannot pile up unbounded memory in front of a slow disk)
+    - a path ending in '.gz' is written gzip-compressed
+    - the chunks go to a temporary file next to the target, which replaces the target
+      with os.replace only in close(); readers never see a half-written file, and an
+      aborted run keeps the previous output
+
+    A thread overlaps the disk writes and the compression (both release the GIL). With
+    process=True the chunks are pickled to a separate writer process instead, so the
+    CSV formatting itself also runs in parallel on another core.
+
+    Use as a context manager: leaving the block normally closes (commits) the file,
+    leaving it with an exception aborts it.
+    """
+
+    def __init__(self, path, queue_size=4, process=False):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.num_rows = 0
+        self._error = None
+        self._closed = False
+        compress = str(path).endswith(".gz")
+        if process:
+            import multiprocessing
+            ctx = multiprocessing.get_context("spawn")
+            self.queue = ctx.Queue(maxsize=max(1, queue_size))
+            self._results = ctx.Queue()
+            self._worker = ctx.Process(target=_writer_process, args=(self.queue, self._results, self.tmp_path, compress), daemon=True)
+        else:
+            self.queue = queue.Queue(maxsize=max(1, queue_size))
+            self._results = None
+            self._worker = threading.Thread(target=self._run_thread, args=(compress,), daemon=True)
+        self._worker.start()
+
+    def _run_thread(self, compress):
+        self.num_rows, self._error = _write_chunks(self.queue, self.tmp_path, compress)
+
+    def write(self, df):
+        """
+        Queues one chunk (the first chunk also writes the header). Raises the error of
+        a writer thread that already failed.
+        """
+        if self._error is not None:
+            raise self._error
+        while True:
+            try:
+                self.queue.put(df, timeout=1.0)
+                return
+            except queue.Full:
+                if not self._worker.is_alive():
+                    raise RuntimeError(f"The writer of {self.path} stopped unexpectedly")
+
+    def _finish(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._worker.is_alive():
+            self.queue.put(None)
+        if self._results is not None:
+            try:
+                self.num_rows, error = self._results.get(timeout=None if self._worker.is_alive() else 1.0)
+            except queue.Empty:
+                error = "the writer process stopped unexpectedly"
+            if error is not None:
+                self._error = RuntimeError(f"Writing {self.path} failed: {error}")
+        self._worker.join()
+
+    def close(self):
+        """
+        Waits for the queued chunks and atomically replaces the target file.
+        """
+        self._finish()
+        if self._error is not None:
+            self.abort()
+            raise self._error
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """
+        Stops writing and removes the temporary file; the target file is left untouched.
+        """
+        self._finish()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def write_csv(df, path, chunk_rows=100000, queue_size=4, process=False):
+    """
+    df.to_csv(path, index=False) through an AsyncCsvWriter: written in chunks of
+    chunk_rows lines, gzip-compressed for '.gz' paths and replaced atomically.
+    """
+    with AsyncCsvWriter(path, queue_size=queue_size, process=process) as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            writer.write(df.iloc[start:start + chunk_rows])
@@ -0,0 +1,106 @@
+import pandas as pd
+import numpy as np
+from utils.getKinematics import compute_kinematics, check_kinematics
+from utils.getFOVintersections import intersect_fov_with_rows
+
+RIG_COLUMNS = ["Camera", "Lateral_Offset_m", "Longitudinal_Offset_m", "Yaw_deg", "FOV_deg"]
+
+
+def load_camera_rig(rig_file):
+    """
+    Reads a camera rig configuration CSV with one line per camera.
+
+    Columns:
+        Camera:                camera name used as key in the output table
+        Lateral_Offset_m:      offset from GPS receiver, positive to the left of motion
+        Longitudinal_Offset_m: offset from GPS receiver, positive along the motion
+        Yaw_deg:               optical axis angle from the motion direction,
+                               counter-clockwise (90 = left, -90 = right)
+        FOV_deg:               horizontal field of view of the lens
+
+    Returns:
+        rig: DataFrame with the columns above
+    """
+    rig = pd.read_csv(rig_file)
+    missing = [c for c in RIG_COLUMNS if c not in rig.columns]
+    if missing:
+        raise ValueError(f"Camera rig file {rig_file} is missing columns: {missing}")
+    if rig.empty:
+        raise ValueError(f"Camera rig file {rig_file} contains no cameras.")
+    if rig["Camera"].duplicated().any():
+        raise ValueError(f"Camera rig file {rig_file} contains duplicated camera names.")
+    rig = rig[RIG_COLUMNS].copy()
+    rig["Camera"] = rig["Camera"].astype(str)
+    return rig.reset_index(drop=True)
+
+
+def single_camera_rig(offset_m=0.76, fov_deg=60.5):
+    """
+    Builds the rig equivalent of the classic single left-looking camera.
+    """
+    return pd.DataFrame([["Left", offset_m, 0.0, 90.0, fov_deg]], columns=RIG_COLUMNS)
+
+
+def compute_rig_camera_positions(df_img, rig, kinematics=None):
+    """
+    Computes positions and optical axes of every camera on the rig in one pass.
+    Motion vectors are computed once and shared by all cameras.
+
+    Parameters:
+        df_img: DataFrame with ['Image_ID', 'Latitude', 'Longitude'] (e.g. output of compute_moving_direction)
+        rig:    DataFrame from load_camera_rig
+        kinematics: optional output of compute_kinematics for df_img sorted by Image_ID
+
+    Returns:
+        df: long DataFrame keyed by (Image_ID, Camera) with additional columns
+            ['Camera', 'Camera_Long', 'Camera_Lat', 'Camera_Axis_East', 'Camera_Axis_North', 'Camera_FOV_deg']
+    """
+    df_img = df_img.sort_values(by="Image_ID").reset_index(drop=True)
+    n = len(df_img)
+    if n == 0:
+        raise ValueError("Image_GPS.csv contains no data.")
+
+    kin = compute_kinematics(df_img) if kinematics is None else check_kinematics(kinematics, df_img)
+    ux = kin["Move_East"].to_numpy()
+    uy = kin["Move_North"].to_numpy()
+    lat = df_img["Latitude"].to_numpy(dtype=float)
+    lon = df_img["Longitude"].to_numpy(dtype=float)
+    lon_factor = 111320.0 * np.cos(np.radians(lat))
+
+    # (cameras, images) broadcasting
+    lateral = rig["Lateral_Offset_m"].to_numpy(dtype=float)[:, None]
+    longitudinal = rig["Longitudinal_Offset_m"].to_numpy(dtype=float)[:, None]
+    yaw = np.radians(rig["Yaw_deg"].to_numpy(dtype=float))[:, None]
+
+    # left = forward rotated +90 degrees
+    left_x, left_y = -uy, ux
+    cam_x_m = longitudinal * ux + lateral * left_x
+    cam_y_m = longitudinal * uy + lateral * left_y
+    axis_x = np.cos(yaw) * ux - np.sin(yaw) * uy
+    axis_y = np.sin(yaw) * ux + np.cos(yaw) * uy
+
+    n_cam = len(rig)
+    df = df_img.loc[np.tile(np.arange(n), n_cam)].reset_index(drop=True)
+    df["Camera"] = np.repeat(rig["Camera"].to_numpy(), n)
+    df["Camera_Long"] = (lon + cam_x_m / lon_factor).ravel()
+    df["Camera_Lat"] = (lat + cam_y_m / 111320.0).ravel()
+    df["Camera_Axis_East"] = axis_x.ravel()
+    df["Camera_Axis_North"] = axis_y.ravel()
+    df["Camera_FOV_deg"] = np.repeat(rig["FOV_deg"].to_numpy(dtype=float), n)
+
+    df = df.sort_values(by=["Image_ID", "Camera"], kind="stable").reset_index(drop=True)
+    return df
+
+
+def compute_rig_fov_intersections(df, row_file):
+    """
+    Vectorized FOV intersection for the long (Image_ID, Camera) table produced by
+    compute_rig_camera_positions and assign_image_rows. Rays are cast along each
+    camera's optical axis and its ±FOV/2 boundaries.
+
+    Returns the same df with new columns:
+        - FOV_Center_Long, FOV_Center_Lat
+        - FOV_Left_Long,   FOV_Left_Lat
+        - FOV_Right_Long,  FOV_Right_Lat
+    """
+    return intersect_fov_with_rows(df, row_file, df["Camera_Axis_East"], df["Camera_Axis_North"], df["Camera_FOV_deg"])
@@ -1,5 +1,5 @@
-import pandas as pd
 import numpy as np
+from utils.rowSpatialIndex import load_row_polylines, RowSegmentIndex
 
 def point_to_line_distance_degree(P, P0, d):
     """
@@ -11,13 +11,16 @@ def point_to_line_distance_degree(P, P0, d):
     foot = P0 + s * d
     return np.linalg.norm(P - foot)
 
-def assign_image_rows(df_with_camera, row_file):
+def assign_image_rows(df_with_camera, row_file, cell_size=None):
     """
-    Assigns each image (camera) point to the nearest row line based on Camera_Long and Camera_Lat.
+    Assigns each image (camera) point to the nearest row based on Camera_Long and Camera_Lat.
+    Rows may be straight S/E lines or polylines with extra numeric vertex IDs between
+    'S' and 'E'; a grid index over the row segments keeps each lookup local.
     
     Parameters:
         df_with_camera: DataFrame containing ['Camera_Long', 'Camera_Lat'] for each image
-        row_file: path to vineyard row start/end file
+        row_file: path to vineyard row start/end (and optional vertex) file
+        cell_size: grid cell size in degrees for the segment index (None = automatic)
 
     Returns:
         df: original DataFrame with new column 'Assigned_Row'
@@ -25,28 +28,13 @@ def assign_image_rows(df_with_camera, row_file):
     df = df_with_camera.copy()
     cam_pts = np.vstack([df["Camera_Long"], df["Camera_Lat"]]).T
 
-    df_row = pd.read_csv(row_file)
-    row_lines = []
-    for row_val in df_row['Row'].unique():
-        sub = df_row[df_row['Row'] == row_val]
-        S = sub[sub['ID'] == 'S'].iloc[0]
-        E = sub[sub['ID'] == 'E'].iloc[0]
-        P0 = np.array([S["Longitude"], S["Latitude"]])
-        d_raw = np.array([E["Longitude"] - S["Longitude"], E["Latitude"] - S["Latitude"]])
-        norm = np.linalg.norm(d_raw)
-        d = d_raw / norm if norm > 1e-6 else np.array([1.0, 0.0])
-        row_lines.append((row_val, P0, d))
+    polylines = load_row_polylines(row_file)
+    if not polylines or len(cam_pts) == 0:
+        df["Assigned_Row"] = -1
+        return df
 
-    assigned = []
-    for P in cam_pts:
-        best_row = -1
-        best_dist = float('inf')
-        for row_val, P0, d in row_lines:
-            dist = point_to_line_distance_degree(P, P0, d)
-            if dist < best_dist:
-                best_dist = dist
-                best_row = row_val
-        assigned.append(best_row)
+    index = RowSegmentIndex(polylines, cell_size=cell_size)
+    assigned, _ = index.query(cam_pts)
 
     df["Assigned_Row"] = assigned
     return df
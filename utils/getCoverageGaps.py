@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+from utils.matchVinesInCamFOV import build_row_map, project_points_on_rows, parse_covered_vines
+
+GAP_COLUMNS = ["Row", "Row_Length_m", "Num_Images", "Covered_m", "Coverage_Ratio", "Max_Depth",
+               "Mean_Depth", "Num_Gaps", "Gaps_m", "Vines_Under_K"]
+
+
+def coverage_profile(s_lo, s_hi, start, end):
+    """
+    Sweep-line coverage depth of the intervals [s_lo, s_hi] over [start, end]: the
+    endpoints are sorted once and a cumulative sum over the +1/-1 difference array
+    gives the depth between consecutive breakpoints, O(n log n).
+
+    Returns:
+        breaks: sorted unique breakpoints (first = start, last = end)
+        depth: number of intervals covering each piece [breaks[i], breaks[i + 1]]
+    """
+    lo = np.clip(s_lo, start, end)
+    hi = np.clip(s_hi, start, end)
+    pos = np.r_[lo, hi, start, end]
+    delta = np.r_[np.ones(len(lo), dtype=np.int64), -np.ones(len(hi), dtype=np.int64), 0, 0]
+    order = np.argsort(pos, kind="stable")
+    pos = pos[order]
+    depth_after = np.cumsum(delta[order])
+
+    # depth after the last event at each position
+    last = np.r_[pos[1:] != pos[:-1], True]
+    return pos[last], depth_after[last][:-1]
+
+
+def uncovered_ranges(breaks, depth, min_length=0.0):
+    """
+    Merged (start, end) station ranges with depth 0, dropping those shorter than min_length.
+    """
+    zero = depth == 0
+    if not zero.any():
+        return []
+    edges = np.diff(np.r_[0, zero.astype(np.int8), 0])
+    run_start = np.flatnonzero(edges == 1)
+    run_end = np.flatnonzero(edges == -1)
+    gaps = [(breaks[a], breaks[b]) for a, b in zip(run_start, run_end)]
+    return [(a, b) for a, b in gaps if b - a >= min_length]
+
+
+def compute_coverage_gaps(df_imgs, row_file, vine_file, k=2, min_gap_m=0.1):
+    """
+    Per-row coverage report of the matcher output along the row stations (meters from 'S'
+    towards 'E', see project_points_on_rows).
+
+    Parameters:
+        df_imgs: matcher output with ['Assigned_Row', 'FOV_Left_*', 'FOV_Right_*', 'Covered_Vines']
+        row_file: row start/end file (each row is reported over its S -> E span, along the
+                  polyline for curved rows)
+        vine_file: vine coverage file (vines with fewer than k views are listed)
+        k: required number of views per vine
+        min_gap_m: uncovered stretches shorter than this are ignored
+
+    Returns:
+        report: DataFrame with GAP_COLUMNS, one line per row, where
+            - Gaps_m lists the uncovered station ranges as "start-end;start-end" (meters)
+            - Vines_Under_K lists the vines seen fewer than k times as "id:views,id:views"
+            - Max_Depth / Mean_Depth are the largest and the length-weighted mean number of
+              overlapping FOVs along the row
+    """
+    row_map = build_row_map(pd.read_csv(row_file))
+    df_vines = pd.read_csv(vine_file)
+
+    rows = df_imgs["Assigned_Row"].to_numpy()
+    s_left = project_points_on_rows(df_imgs["FOV_Left_Long"], df_imgs["FOV_Left_Lat"], rows, row_map)
+    s_right = project_points_on_rows(df_imgs["FOV_Right_Long"], df_imgs["FOV_Right_Lat"], rows, row_map)
+    s_lo = np.minimum(s_left, s_right)
+    s_hi = np.maximum(s_left, s_right)
+    valid = ~np.isnan(s_lo) & ~np.isnan(s_hi)
+
+    # views per vine as matched by match_vines_in_fov
+    _, v_rows, v_ids = parse_covered_vines(df_imgs["Covered_Vines"])
+    views = pd.Series(1, index=pd.MultiIndex.from_arrays([v_rows, v_ids])).groupby(level=[0, 1]).sum()
+    vine_views = views.reindex(pd.MultiIndex.from_arrays([df_vines["Row"], df_vines["ID"]]), fill_value=0).to_numpy()
+
+    records = []
+    for row_val, (ref_lat, ref_lon, dx_r, dy_r, norm_r, vertices) in row_map.items():
+        on_row = valid & (rows == row_val)
+        breaks, depth = coverage_profile(s_lo[on_row], s_hi[on_row], 0.0, norm_r)
+        lengths = np.diff(breaks)
+        covered = float(lengths[depth > 0].sum())
+        gaps = uncovered_ranges(breaks, depth, min_gap_m)
+
+        vine_sel = (df_vines["Row"] == row_val).to_numpy() & (vine_views < k)
+        under_k = ",".join(f"{int(v)}:{int(n)}" for v, n in zip(df_vines["ID"].to_numpy()[vine_sel], vine_views[vine_sel]))
+
+        records.append({
+            "Row": row_val,
+            "Row_Length_m": round(norm_r, 2),
+            "Num_Images": int(on_row.sum()),
+            "Covered_m": round(covered, 2),
+            "Coverage_Ratio": round(covered / norm_r, 4) if norm_r > 0 else 0.0,
+            "Max_Depth": int(depth.max()) if len(depth) else 0,
+            "Mean_Depth": round(float((depth * lengths).sum() / norm_r), 2) if norm_r > 0 else 0.0,
+            "Num_Gaps": len(gaps),
+            "Gaps_m": ";".join(f"{a:.2f}-{b:.2f}" for a, b in gaps),
+            "Vines_Under_K": under_k,
+        })
+    return pd.DataFrame(records, columns=GAP_COLUMNS)
@@ -0,0 +1,115 @@
+import pandas as pd
+import numpy as np
+from utils.rowSpatialIndex import load_row_polylines, RowSegmentIndex
+from utils.matchVinesInCamFOV import (build_row_map, build_vine_intervals, row_frame_coordinates,
+                                      project_points_on_rows, match_stations_to_intervals, format_covered_vines)
+
+
+class EventAnnotator:
+    """
+    Attaches geotagged events of any stream (spectrometer readings, LiDAR sweeps, notes,
+    ...) to rows and vines with the same geometry the image matcher uses: nearest row
+    through the RowSegmentIndex, station along the row with project_points_on_rows and
+    the sorted vine coverage intervals of build_vine_intervals.
+
+    The row index and the vine intervals are built once; annotating works on chunks of
+    events so tables with tens of millions of lines stay within memory. cell_size is the
+    grid cell of the row index in degrees (None = automatic, as for image logs).
+    max_row_distance_m is compared with the distance to the nearest row polyline that
+    the index returns.
+    """
+
+    def __init__(self, row_file, vine_file, max_row_distance_m=None, chunk_size=1000000, cell_size=None):
+        self.row_map = build_row_map(pd.read_csv(row_file))
+        self.row_index = RowSegmentIndex(load_row_polylines(row_file), cell_size=cell_size)
+        self.df_vines = pd.read_csv(vine_file)
+        self.intervals = build_vine_intervals(self.df_vines, self.row_map)
+        self.vine_ids = self.df_vines["ID"].to_numpy(dtype=np.int64)
+        self.max_row_distance_m = max_row_distance_m
+        self.chunk_size = chunk_size
+
+    def _rows_and_stations(self, lon, lat):
+        rows, distance = self.row_index.query(np.column_stack([lon, lat]), in_meters=self.max_row_distance_m is not None)
+        station, offset = row_frame_coordinates(lon, lat, rows, self.row_map)
+        if self.max_row_distance_m is not None:
+            far = ~(distance <= self.max_row_distance_m)
+            rows = np.where(far, -1, rows)
+            station = np.where(far, np.nan, station)
+            offset = np.where(far, np.nan, offset)
+        return rows, station, offset
+
+    def annotate_points(self, lon, lat):
+        """
+        Returns:
+            rows: nearest row of every point (-1 if farther than max_row_distance_m from its polyline)
+            station: meters from the row 'S' along S -> E (NaN without a row)
+            offset: signed distance from the S -> E line (meters, positive to the left; NaN without a row)
+            vine_id: ID of the vine whose coverage interval holds the station (-1 if none)
+        """
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        rows, station, offset = self._rows_and_stations(lon, lat)
+        vine_id = np.full(len(lon), -1, dtype=np.int64)
+        rec_idx, vine_idx = match_stations_to_intervals(rows, station, station, self.intervals)
+        # adjacent intervals share their end point: keep the first vine per event
+        first = np.r_[True, rec_idx[1:] != rec_idx[:-1]] if len(rec_idx) else np.zeros(0, dtype=bool)
+        vine_id[rec_idx[first]] = self.vine_ids[vine_idx[first]]
+        return rows, station, offset, vine_id
+
+    def annotate_spans(self, start_lon, start_lat, end_lon, end_lat):
+        """
+        Span events run from a start to an end point along one row (the row nearest to
+        their midpoint).
+
+        Returns:
+            rows, station_start, station_end, covered: covered is the 'Covered_Vines'
+            string ("row-id,row-id,...") of the vines whose intervals overlap the span
+        """
+        start_lon, start_lat = np.asarray(start_lon, dtype=float), np.asarray(start_lat, dtype=float)
+        end_lon, end_lat = np.asarray(end_lon, dtype=float), np.asarray(end_lat, dtype=float)
+        rows, _, _ = self._rows_and_stations((start_lon + end_lon) / 2.0, (start_lat + end_lat) / 2.0)
+        s_start = project_points_on_rows(start_lon, start_lat, rows, self.row_map)
+        s_end = project_points_on_rows(end_lon, end_lat, rows, self.row_map)
+        rec_idx, vine_idx = match_stations_to_intervals(rows, np.minimum(s_start, s_end),
+                                                        np.maximum(s_start, s_end), self.intervals)
+        return rows, s_start, s_end, format_covered_vines(len(rows), rec_idx, vine_idx, self.df_vines)
+
+    def annotate(self, df_events, lat_column="Latitude", lon_column="Longitude", end_columns=None):
+        """
+        Annotates a table of events in chunks of chunk_size lines.
+
+        Parameters:
+            df_events: events with lat_column/lon_column (any other columns, e.g. a time
+                       stamp, are kept as they are)
+            end_columns: optional (end latitude, end longitude) column names for span events
+
+        Returns:
+            df: copy of df_events with 'Assigned_Row', 'Row_Station_m', 'Row_Offset_m' and
+                'Vine_ID' for point events, or 'Assigned_Row', 'Start_Station_m',
+                'End_Station_m' and 'Covered_Vines' for span events
+        """
+        n = len(df_events)
+        lat = df_events[lat_column].to_numpy(dtype=float)
+        lon = df_events[lon_column].to_numpy(dtype=float)
+        if end_columns is None:
+            columns = {"Assigned_Row": np.zeros(n, dtype=np.int64), "Row_Station_m": np.zeros(n),
+                       "Row_Offset_m": np.zeros(n), "Vine_ID": np.zeros(n, dtype=np.int64)}
+        else:
+            end_lat = df_events[end_columns[0]].to_numpy(dtype=float)
+            end_lon = df_events[end_columns[1]].to_numpy(dtype=float)
+            columns = {"Assigned_Row": np.zeros(n, dtype=np.int64), "Start_Station_m": np.zeros(n),
+                       "End_Station_m": np.zeros(n), "Covered_Vines": np.full(n, "", dtype=object)}
+
+        for start in range(0, n, self.chunk_size):
+            sl = slice(start, start + self.chunk_size)
+            if end_columns is None:
+                results = self.annotate_points(lon[sl], lat[sl])
+            else:
+                results = self.annotate_spans(lon[sl], lat[sl], end_lon[sl], end_lat[sl])
+            for arr, values in zip(columns.values(), results):
+                arr[sl] = values
+
+        df = df_events.copy()
+        for col, arr in columns.items():
+            df[col] = arr
+        return df
@@ -1,13 +1,117 @@
-import pandas as pd
 import numpy as np
-import math
+from utils.getKinematics import compute_kinematics, check_kinematics
+from utils.rowSpatialIndex import load_row_polylines
 
 
-def compute_fov_intersections(df, row_file, fov_deg=60.5):
+def fov_intersections_arrays(cam_lon, cam_lat, rows, axis_east, axis_north, fov_deg, row_polylines):
+    """
+    Array core of the FOV intersection: casts the optical axis (axis_east, axis_north,
+    unit vectors in local meters) and its ±fov_deg/2 boundaries from each camera point
+    onto its row, in local meter space around the camera. A straight S/E row is the
+    infinite S -> E line; a curved row is its polyline (row_polylines from
+    load_row_polylines) with the first and last segments extended, and a ray takes
+    its nearest crossing.
+
+    Returns:
+        out: array (n, 6) with center, left and right intersections as (lon, lat) pairs,
+             NaN where the ray misses the row or the row is unknown
+    """
+    cam_lon = np.asarray(cam_lon, dtype=float)
+    cam_lat = np.asarray(cam_lat, dtype=float)
+    rows = np.asarray(rows)
+    n = len(cam_lon)
+    lon_factor = 111320.0 * np.cos(np.radians(cam_lat))
+
+    # row geometry gathered per record
+    row_ends = {r: (*pts[0], *pts[-1]) for r, pts in row_polylines.items()}
+    has_row = np.array([r in row_ends for r in rows], dtype=bool)
+    seg = np.full((n, 4), np.nan)
+    if has_row.any():
+        seg[has_row] = np.array([row_ends[r] for r in rows[has_row]], dtype=float)
+
+    p0_x = (seg[:, 0] - cam_lon) * lon_factor
+    p0_y = (seg[:, 1] - cam_lat) * 111320.0
+    d_x = (seg[:, 2] - seg[:, 0]) * lon_factor
+    d_y = (seg[:, 3] - seg[:, 1]) * 111320.0
+
+    axis_x = np.asarray(axis_east, dtype=float)
+    axis_y = np.asarray(axis_north, dtype=float)
+    half = np.radians(np.broadcast_to(np.asarray(fov_deg, dtype=float), (n,)) / 2.0)
+    curved = [(np.flatnonzero(rows == r), pts) for r, pts in row_polylines.items() if len(pts) > 2]
+
+    out = np.full((n, 6), np.nan)
+    for k, angle in enumerate((np.zeros(n), half, -half)):
+        c, s = np.cos(angle), np.sin(angle)
+        r_x = c * axis_x - s * axis_y
+        r_y = s * axis_x + c * axis_y
+        denom = r_x * d_y - r_y * d_x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (p0_x * d_y - p0_y * d_x) / denom
+        ok = has_row & (np.abs(denom) >= 1e-9) & (t >= 0)
+        for sel, pts in curved:
+            t[sel] = _polyline_ray_distance(cam_lon[sel], cam_lat[sel], lon_factor[sel], r_x[sel], r_y[sel], pts)
+            ok[sel] = np.isfinite(t[sel])
+        out[ok, 2 * k] = cam_lon[ok] + t[ok] * r_x[ok] / lon_factor[ok]
+        out[ok, 2 * k + 1] = cam_lat[ok] + t[ok] * r_y[ok] / 111320.0
+    return out
+
+
+def _polyline_ray_distance(cam_lon, cam_lat, lon_factor, r_x, r_y, pts):
+    """
+    Distance (meters) along each ray (r_x, r_y) from its camera to the nearest crossing
+    with the polyline pts (first and last segments extended); inf where it misses.
+    """
+    v_x = (pts[None, :, 0] - cam_lon[:, None]) * lon_factor[:, None]
+    v_y = (pts[None, :, 1] - cam_lat[:, None]) * 111320.0
+    p0_x, p0_y = v_x[:, :-1], v_y[:, :-1]
+    d_x, d_y = np.diff(v_x, axis=1), np.diff(v_y, axis=1)
+    r_x, r_y = r_x[:, None], r_y[:, None]
+    denom = r_x * d_y - r_y * d_x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (p0_x * d_y - p0_y * d_x) / denom
+        u = (p0_x * r_y - p0_y * r_x) / denom
+    lo = np.zeros(len(pts) - 1)
+    lo[0] = -np.inf
+    hi = np.ones(len(pts) - 1)
+    hi[-1] = np.inf
+    hit = (np.abs(denom) >= 1e-9) & (t >= 0) & (u >= lo) & (u <= hi)
+    return np.where(hit, t, np.inf).min(axis=1)
+
+
+FOV_COLUMNS = ["FOV_Center_Long", "FOV_Center_Lat", "FOV_Left_Long", "FOV_Left_Lat", "FOV_Right_Long", "FOV_Right_Lat"]
+
+
+def intersect_fov_with_rows(df, row_file, axis_east, axis_north, fov_deg):
+    """
+    Vectorized FOV intersection of every record of df (Camera_Long, Camera_Lat,
+    Assigned_Row) along the given optical axes, see fov_intersections_arrays.
+
+    Returns the same df with new columns:
+        - FOV_Center_Long, FOV_Center_Lat
+        - FOV_Left_Long,   FOV_Left_Lat
+        - FOV_Right_Long,  FOV_Right_Lat
+    """
+    out = fov_intersections_arrays(
+        df["Camera_Long"].to_numpy(dtype=float), df["Camera_Lat"].to_numpy(dtype=float),
+        df["Assigned_Row"].to_numpy(), axis_east, axis_north, fov_deg, load_row_polylines(row_file)
+    )
+    for k, col in enumerate(FOV_COLUMNS):
+        df[col] = out[:, k]
+    return df
+
+
+def camera_axes_from_kinematics(kinematics):
+    """
+    Optical axis of the classic single camera: left of the motion (rotated +90 degrees).
+    """
+    return -kinematics["Move_North"].to_numpy(), kinematics["Move_East"].to_numpy()
+
+
+def compute_fov_intersections(df, row_file, fov_deg=60.5, kinematics=None):
     """
     For each row in df (must include Camera_Long, Camera_Lat, Image_ID, Assigned_Row),
     compute:
-        - FOV center direction vector based on movement
+        - FOV center direction vector (left of the shared motion vector from compute_kinematics)
         - FOV boundary vectors (±fov_deg/2)
         - Intersection points with the assigned row (center, left, right)
     Returns the same df with new columns:
@@ -15,79 +119,6 @@ def compute_fov_intersections(df, row_file, fov_deg=60.5):
         - FOV_Left_Long,   FOV_Left_Lat
         - FOV_Right_Long,  FOV_Right_Lat
     """
-
-    def rotate_vector(vec, angle_deg):
-        theta = math.radians(angle_deg)
-        c, s = math.cos(theta), math.sin(theta)
-        return np.array([c * vec[0] - s * vec[1], s * vec[0] + c * vec[1]])
-
-    def ray_line_intersection_degree(R0, Rd, P0, d):
-        denom = Rd[0] * d[1] - Rd[1] * d[0]
-        if abs(denom) < 1e-9:
-            return None
-        diff = P0 - R0
-        t = (diff[0]*d[1] - diff[1]*d[0]) / denom
-        if t < 0:
-            return None
-        return R0 + t * Rd
-
-    # Load rows
-    df_row = pd.read_csv(row_file)
-    row_dict = {}
-    for row_val in df_row['Row'].unique():
-        sub = df_row[df_row['Row'] == row_val]
-        S = sub[sub['ID'] == 'S'].iloc[0]
-        E = sub[sub['ID'] == 'E'].iloc[0]
-        P0 = np.array([S["Longitude"], S["Latitude"]])
-        d_raw = np.array([E["Longitude"] - S["Longitude"], E["Latitude"] - S["Latitude"]])
-        d = d_raw / np.linalg.norm(d_raw) if np.linalg.norm(d_raw) > 1e-9 else np.array([1.0, 0.0])
-        row_dict[row_val] = (P0, d)
-
-    n = len(df)
-    half_angle = fov_deg / 2.0
-    cam_coords = df[["Camera_Long", "Camera_Lat"]].values
-
-    centers = []
-    lefts = []
-    rights = []
-
-    for i in range(n):
-        cam = cam_coords[i]
-        row_val = df.at[i, "Assigned_Row"]
-        if row_val not in row_dict:
-            centers.append([np.nan, np.nan])
-            lefts.append([np.nan, np.nan])
-            rights.append([np.nan, np.nan])
-            continue
-
-        # motion vector
-        if i < n - 1 and int(df.at[i + 1, "Image_ID"]) - int(df.at[i, "Image_ID"]) == 1:
-            next_pt = cam_coords[i + 1]
-            move_vec = next_pt - cam
-        elif i > 0:
-            prev_pt = cam_coords[i - 1]
-            move_vec = cam - prev_pt
-        else:
-            move_vec = np.array([1e-6, 0])
-        move_unit = move_vec / np.linalg.norm(move_vec) if np.linalg.norm(move_vec) > 1e-9 else np.array([1.0, 0.0])
-        v_cam = np.array([-move_unit[1], move_unit[0]])
-
-        # FOV boundaries
-        v1 = rotate_vector(v_cam, +half_angle)
-        v2 = rotate_vector(v_cam, -half_angle)
-
-        # intersection with assigned row
-        P0, d_row = row_dict[row_val]
-        I_center = ray_line_intersection_degree(cam, v_cam, P0, d_row)
-        I1 = ray_line_intersection_degree(cam, v1, P0, d_row)
-        I2 = ray_line_intersection_degree(cam, v2, P0, d_row)
-
-        centers.append(I_center if I_center is not None else [np.nan, np.nan])
-        lefts.append(I1 if I1 is not None else [np.nan, np.nan])
-        rights.append(I2 if I2 is not None else [np.nan, np.nan])
-
-    df["FOV_Center_Long"], df["FOV_Center_Lat"] = zip(*centers)
-    df["FOV_Left_Long"], df["FOV_Left_Lat"]     = zip(*lefts)
-    df["FOV_Right_Long"], df["FOV_Right_Lat"]   = zip(*rights)
-
-    return df
+    kin = compute_kinematics(df) if kinematics is None else check_kinematics(kinematics, df)
+    axis_east, axis_north = camera_axes_from_kinematics(kin)
+    return intersect_fov_with_rows(df, row_file, axis_east, axis_north, fov_deg)
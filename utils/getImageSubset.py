@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+import heapq
+from utils.matchVinesInCamFOV import build_row_map, project_points_on_rows, parse_covered_vines
+
+
+def vine_view_scores(df_imgs, df_rows, df_vines):
+    """
+    Scores every (record, vine) pair of the matcher output by how central the vine is in the FOV.
+
+    Parameters:
+        df_imgs: matcher output with ['Covered_Vines', 'FOV_Center_*', 'FOV_Left_*', 'FOV_Right_*']
+        df_rows: row start/end file
+        df_vines: vines with ['Row', 'ID', 'Longitude', 'Latitude']
+
+    Returns:
+        rec_idx: position of the record in df_imgs
+        vine_idx: position of the vine in df_vines
+        centrality: 1 for a vine at FOV_Center, falling linearly to 0 at the FOV edges
+    """
+    rec_idx, rows, vine_ids = parse_covered_vines(df_imgs["Covered_Vines"])
+    vine_idx = pd.MultiIndex.from_arrays([df_vines["Row"], df_vines["ID"]]).get_indexer(
+        pd.MultiIndex.from_arrays([rows, vine_ids]))
+    known = vine_idx >= 0
+    rec_idx, rows, vine_idx = rec_idx[known], rows[known], vine_idx[known]
+
+    row_map = build_row_map(df_rows)
+    s_vine = project_points_on_rows(df_vines["Longitude"].to_numpy(dtype=float)[vine_idx],
+                                    df_vines["Latitude"].to_numpy(dtype=float)[vine_idx], rows, row_map)
+
+    def station(prefix):
+        return project_points_on_rows(df_imgs[f"{prefix}_Long"].to_numpy(dtype=float)[rec_idx],
+                                      df_imgs[f"{prefix}_Lat"].to_numpy(dtype=float)[rec_idx], rows, row_map)
+
+    s_center = station("FOV_Center")
+    half_width = np.abs(station("FOV_Left") - station("FOV_Right")) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        centrality = np.clip(1.0 - np.abs(s_vine - s_center) / half_width, 0.0, 1.0)
+    return rec_idx, vine_idx, np.nan_to_num(centrality, nan=0.0)
+
+
+def greedy_k_cover(rec_idx, vine_idx, centrality, num_vines, k=2):
+    """
+    Greedy set multicover with lazy priority updates: repeatedly picks the record that
+    covers the most vines still needing views (ties broken by the summed centrality of
+    those vines), until every vine has min(k, available views) selected views.
+    Gains only shrink as vines get covered, so a popped record whose recomputed gain
+    equals its stored one is the true maximum and is taken without rescoring the rest.
+
+    Returns:
+        selected: record positions in selection order
+    """
+    order = np.argsort(rec_idx, kind="stable")
+    rec_idx, vine_idx, centrality = rec_idx[order], vine_idx[order], centrality[order]
+    records, starts = np.unique(rec_idx, return_index=True)
+    ends = np.r_[starts[1:], len(rec_idx)]
+
+    views = np.bincount(vine_idx, minlength=num_vines)
+    demand = np.minimum(views, k)
+    remaining = int(demand.sum())
+
+    heap = []
+    for j in range(len(records)):
+        vs = slice(starts[j], ends[j])
+        heap.append((-(ends[j] - starts[j]), -float(centrality[vs].sum()), j))
+    heapq.heapify(heap)
+
+    selected = []
+    while heap and remaining > 0:
+        neg_gain, neg_score, j = heapq.heappop(heap)
+        vines = vine_idx[starts[j]:ends[j]]
+        need = demand[vines] > 0
+        gain = int(need.sum())
+        if gain == 0:
+            continue
+        score = float(centrality[starts[j]:ends[j]][need].sum())
+        if gain == -neg_gain and score == -neg_score:
+            demand[vines[need]] -= 1
+            remaining -= gain
+            selected.append(int(records[j]))
+        else:
+            heapq.heappush(heap, (-gain, -score, j))
+    return selected
+
+
+def select_image_subset(df_imgs, row_file, vine_file, k=2):
+    """
+    Picks a near-minimal set of records (images, or image/camera pairs with a rig) of the
+    matcher output such that every vine is seen at least k times (or in all its images if
+    it has fewer), preferring frames where the vine is close to the FOV center.
+
+    Returns:
+        df_selected: the selected records in Image_ID order with an extra 'Selection_Rank'
+                     column (0 = picked first)
+    """
+    df_imgs = df_imgs.reset_index(drop=True)
+    df_vines = pd.read_csv(vine_file)
+    rec_idx, vine_idx, centrality = vine_view_scores(df_imgs, pd.read_csv(row_file), df_vines)
+    selected = greedy_k_cover(rec_idx, vine_idx, centrality, len(df_vines), k=k)
+
+    views = np.bincount(vine_idx, minlength=len(df_vines))
+    print(f"[INFO] Selected {len(selected)} of {len(df_imgs)} images covering {int((views > 0).sum())} vines "
+          f"(k={k}; {int(((views > 0) & (views < k)).sum())} vines have fewer than k views).")
+
+    df_selected = df_imgs.iloc[selected].copy()
+    df_selected["Selection_Rank"] = np.arange(len(selected))
+    return df_selected.sort_index()
@@ -0,0 +1,75 @@
+import pandas as pd
+import numpy as np
+
+KINEMATICS_COLUMNS = ["Move_East", "Move_North", "Motion_Valid", "Has_Next",
+                      "Step_m", "Heading_deg", "Speed_mps"]
+
+
+def compute_kinematics(df_img, time_column="ROS_Time_Stamp"):
+    """
+    Computes the robot motion once for the whole GPS log so every later stage
+    (direction, camera position, FOV) uses the same vectors.
+
+    The motion vector of image i points to image i+1 when its Image_ID is
+    consecutive and the robot moved; otherwise the last valid vector is reused
+    (starting from east, (1, 0)).
+
+    Parameters:
+        df_img: DataFrame sorted by Image_ID with ['Image_ID', 'Latitude', 'Longitude']
+        time_column: timestamp column (seconds) used for the speed, ignored if missing
+
+    Returns:
+        kin: DataFrame aligned with df_img with columns
+            - Move_East, Move_North: unit motion vector in local meters
+            - Motion_Valid: True where the vector comes from this image's own step
+            - Has_Next: True where the next Image_ID is consecutive
+            - Step_m: distance to the next image in meters (NaN at gaps)
+            - Heading_deg: heading clockwise from north in degrees
+            - Speed_mps: Step_m / time step (NaN at gaps or without time)
+    """
+    n = len(df_img)
+    ids = df_img["Image_ID"].to_numpy(dtype=np.int64)
+    lat = df_img["Latitude"].to_numpy(dtype=float)
+    lon = df_img["Longitude"].to_numpy(dtype=float)
+    lon_factor = 111320.0 * np.cos(np.radians(lat))
+
+    has_next = np.zeros(n, dtype=bool)
+    dx_m = np.full(n, np.nan)
+    dy_m = np.full(n, np.nan)
+    if n > 1:
+        has_next[:-1] = np.diff(ids) == 1
+        dx_m[:-1] = (lon[1:] - lon[:-1]) * lon_factor[:-1]
+        dy_m[:-1] = (lat[1:] - lat[:-1]) * 111320.0
+    step = np.where(has_next, np.hypot(dx_m, dy_m), np.nan)
+
+    valid = has_next & (step > 1e-6)
+    safe = np.where(valid, step, 1.0)
+    move_e = pd.Series(np.where(valid, dx_m / safe, np.nan)).ffill().fillna(1.0).to_numpy()
+    move_n = pd.Series(np.where(valid, dy_m / safe, np.nan)).ffill().fillna(0.0).to_numpy()
+
+    speed = np.full(n, np.nan)
+    if time_column in df_img.columns and n > 1:
+        t = df_img[time_column].to_numpy(dtype=float)
+        dt = np.full(n, np.nan)
+        dt[:-1] = np.diff(t)
+        ok = has_next & (dt > 0)
+        speed[ok] = step[ok] / dt[ok]
+
+    return pd.DataFrame({
+        "Move_East": move_e,
+        "Move_North": move_n,
+        "Motion_Valid": valid,
+        "Has_Next": has_next,
+        "Step_m": step,
+        "Heading_deg": np.degrees(np.arctan2(move_e, move_n)) % 360.0,
+        "Speed_mps": speed,
+    }, index=df_img.index)
+
+
+def check_kinematics(kinematics, df):
+    """
+    Makes sure a precomputed kinematics table belongs to df (same length).
+    """
+    if len(kinematics) != len(df):
+        raise ValueError(f"Kinematics has {len(kinematics)} records but the data has {len(df)}.")
+    return kinematics
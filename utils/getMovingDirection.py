@@ -1,20 +1,25 @@
 import pandas as pd
+import numpy as np
 import math
+from utils.getKinematics import compute_kinematics, check_kinematics
 
 def compute_moving_direction(
     gps_file="Data/OBlock/Image_GPS.csv",
-    row_file="Data/OBlock/Row_SE_GPS_OBlock.csv"
+    row_file="Data/OBlock/Row_SE_GPS_OBlock.csv",
+    kinematics=None
 ):
     """
     Reads gps_file (Image_GPS.csv) and row_file (Row_SE_GPS_OBlock.csv),
     computes robot moving direction vs. average row direction,
     classifies each data point as 'F' (forward, same direction as row vector direction) or 'B' (backward, opposite direction as row vector direction),
     returns a DataFrame with an additional column 'Direction'.
+    The motion vectors come from compute_kinematics (pass `kinematics` to reuse a precomputed one).
+    `gps_file` may also be an already loaded DataFrame.
     """
-    df_img = pd.read_csv(gps_file)
+    df_img = gps_file.copy() if isinstance(gps_file, pd.DataFrame) else pd.read_csv(gps_file)
     df_img = df_img.sort_values(by="Image_ID").reset_index(drop=True)
 
-    # Step 1: Compute average global row direction vector
+    # Step 1: Compute average global row direction vector (local meters)
     df_row = pd.read_csv(row_file)
     v_vectors = []
     for row_val in df_row['Row'].unique():
@@ -22,8 +27,9 @@ def compute_moving_direction(
         start = subdf[subdf['ID'] == 'S']
         end   = subdf[subdf['ID'] == 'E']
         if not start.empty and not end.empty:
-            dx = end.iloc[0]["Longitude"] - start.iloc[0]["Longitude"]
-            dy = end.iloc[0]["Latitude"]  - start.iloc[0]["Latitude"]
+            lon_factor = 111320.0 * math.cos(math.radians(start.iloc[0]["Latitude"]))
+            dx = (end.iloc[0]["Longitude"] - start.iloc[0]["Longitude"]) * lon_factor
+            dy = (end.iloc[0]["Latitude"]  - start.iloc[0]["Latitude"]) * 111320.0
             v_vectors.append((dx, dy))
 
     if not v_vectors:
@@ -37,26 +43,11 @@ def compute_moving_direction(
         else:
             V_se_unit = (avg_dx / norm, avg_dy / norm)
 
-    # Step 2: Compute movement direction between consecutive GPS points
-    directions = []
-    n = len(df_img)
-    for i in range(n):
-        if i < n - 1:
-            curr_id = int(df_img.iloc[i]["Image_ID"])
-            next_id = int(df_img.iloc[i + 1]["Image_ID"])
-            if next_id - curr_id == 1:
-                dx = df_img.iloc[i + 1]["Longitude"] - df_img.iloc[i]["Longitude"]
-                dy = df_img.iloc[i + 1]["Latitude"]  - df_img.iloc[i]["Latitude"]
-                mag = math.hypot(dx, dy)
-                if mag < 1e-6:
-                    directions.append("F")
-                else:
-                    dot = dx * V_se_unit[0] + dy * V_se_unit[1]
-                    directions.append("F" if dot >= 0 else "B")
-            else:
-                directions.append(directions[i - 1] if i > 0 else "F")
-        else:
-            directions.append(directions[i - 1] if i > 0 else "F")
-
-    df_img["Direction"] = directions
+    # Step 2: Classify the shared motion vectors; frames without their own
+    # motion keep the previous direction ('F' before the first valid one)
+    kin = compute_kinematics(df_img) if kinematics is None else check_kinematics(kinematics, df_img)
+    dot = kin["Move_East"].to_numpy() * V_se_unit[0] + kin["Move_North"].to_numpy() * V_se_unit[1]
+    directions = pd.Series(np.where(dot >= 0, "F", "B"), dtype=object)
+    directions[~kin["Motion_Valid"].to_numpy()] = None
+    df_img["Direction"] = directions.ffill().fillna("F").to_numpy()
     return df_img
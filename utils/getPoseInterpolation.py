@@ -0,0 +1,126 @@
+import pandas as pd
+import numpy as np
+from utils.getKinematics import compute_kinematics
+
+
+class GpsTrack:
+    """
+    A GPS track (fixes with a timestamp) used to resample image poses at the image times.
+
+    For every segment, the last segment at or before it in which the receiver moved is
+    computed once when the track is loaded; every lookup afterwards is a binary search
+    plus array gathers with no Python loop over images, which stays cheap for tracks with
+    tens of millions of fixes.
+    """
+
+    def __init__(self, t, lat, lon):
+        t = np.asarray(t, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if len(t) < 2:
+            raise ValueError("A GPS track needs at least two fixes.")
+        if (np.diff(t) < 0).any():
+            order = np.argsort(t, kind="stable")
+            t, lat, lon = t[order], lat[order], lon[order]
+        self.t, self.lat, self.lon = t, lat, lon
+
+        # last moving segment <= k; before the first motion use the first moving segment.
+        # Only this index array is kept; segment vectors are recomputed for the looked-up ones.
+        moving = self._segment_length(np.arange(len(t) - 1)) > 1e-6
+        idx = np.arange(len(moving), dtype=np.int64 if len(moving) >= 2**31 else np.int32)
+        last = np.maximum.accumulate(np.where(moving, idx, -1))
+        first = int(np.argmax(moving)) if moving.any() else 0
+        self.seg_source = np.where(last >= 0, last, first).astype(idx.dtype)
+
+    def _segment_vector(self, k):
+        # local meter vector of track segments k -> k + 1
+        seg_e = (self.lon[k + 1] - self.lon[k]) * 111320.0 * np.cos(np.radians(self.lat[k]))
+        seg_n = (self.lat[k + 1] - self.lat[k]) * 111320.0
+        return seg_e, seg_n
+
+    def _segment_length(self, k):
+        return np.hypot(*self._segment_vector(k))
+
+    @classmethod
+    def from_csv(cls, track_file, time_column="ROS_Time_Stamp"):
+        """
+        Reads only the time, Latitude and Longitude columns of the track file.
+        """
+        df = pd.read_csv(track_file, usecols=[time_column, "Latitude", "Longitude"], dtype=np.float64)
+        return cls(df[time_column].to_numpy(), df["Latitude"].to_numpy(), df["Longitude"].to_numpy())
+
+    def _locate(self, times):
+        times = np.asarray(times, dtype=np.float64)
+        k = np.clip(np.searchsorted(self.t, times, side="right") - 1, 0, len(self.t) - 2)
+        dt = self.t[k + 1] - self.t[k]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(dt > 0, (times - self.t[k]) / dt, 0.0)
+        return k, np.clip(w, 0.0, 1.0)
+
+    def outside(self, times):
+        """
+        True for times before the first or after the last fix (poses are held there).
+        """
+        times = np.asarray(times, dtype=np.float64)
+        return (times < self.t[0]) | (times > self.t[-1])
+
+    def positions(self, times):
+        """
+        Linearly interpolated (lat, lon) at the given times.
+        """
+        k, w = self._locate(times)
+        lat = self.lat[k] + w * (self.lat[k + 1] - self.lat[k])
+        lon = self.lon[k] + w * (self.lon[k + 1] - self.lon[k])
+        return lat, lon
+
+    def motion(self, times):
+        """
+        Unit motion vector (east, north) of the track segment holding each time (the last
+        moving segment if the receiver stood still), whether that segment itself moved,
+        and the segment speed in m/s (NaN for zero-length time steps).
+        """
+        k, _ = self._locate(times)
+        seg_len = self._segment_length(k)
+        seg_e, seg_n = self._segment_vector(self.seg_source[k])
+        norm = np.hypot(seg_e, seg_n)
+        ok = norm > 1e-6
+        safe = np.where(ok, norm, 1.0)
+        dt = self.t[k + 1] - self.t[k]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speed = np.where(dt > 0, seg_len / dt, np.nan)
+        return (np.where(ok, seg_e / safe, 1.0), np.where(ok, seg_n / safe, 0.0), seg_len > 1e-6, speed)
+
+
+def interpolate_image_poses(df_img, track, time_column="ROS_Time_Stamp"):
+    """
+    Replaces the logged Latitude/Longitude of every image by the track position at its
+    time_column timestamp (same unit as the track times).
+
+    Returns:
+        df: copy of df_img with resampled Latitude/Longitude
+    """
+    if time_column not in df_img.columns:
+        raise ValueError(f"Image log has no '{time_column}' column to interpolate the GPS track at.")
+    times = df_img[time_column].to_numpy(dtype=np.float64)
+    num_outside = int(track.outside(times).sum())
+    if num_outside:
+        print(f"[INFO] {num_outside} images lie outside the GPS track time range; their poses are held at the track ends.")
+    df = df_img.copy()
+    df["Latitude"], df["Longitude"] = track.positions(times)
+    return df
+
+
+def compute_track_kinematics(df_img, track, time_column="ROS_Time_Stamp"):
+    """
+    compute_kinematics for images whose positions come from interpolate_image_poses, with
+    the motion vectors, heading and speed taken from the GPS track at each image time
+    instead of from the neighbouring image.
+    """
+    kin = compute_kinematics(df_img, time_column=time_column)
+    move_e, move_n, moving, speed = track.motion(df_img[time_column].to_numpy(dtype=np.float64))
+    kin["Move_East"] = move_e
+    kin["Move_North"] = move_n
+    kin["Motion_Valid"] = moving
+    kin["Heading_deg"] = np.degrees(np.arctan2(move_e, move_n)) % 360.0
+    kin["Speed_mps"] = speed
+    return kin
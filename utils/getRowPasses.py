@@ -0,0 +1,102 @@
+import pandas as pd
+import numpy as np
+
+PASS_COLUMNS = ["Pass_ID", "Start_Index", "End_Index", "Start_Image_ID", "End_Image_ID",
+                "Assigned_Row", "Direction", "Num_Images"]
+
+
+def _smooth_labels(code, gap_break, min_run_length):
+    """
+    Hysteresis on a label sequence: a run shorter than min_run_length whose
+    neighbours (without an Image_ID gap in between) share the same label is
+    relabelled to that label. Repeats until the sequence is stable.
+    """
+    n = len(code)
+    code = code.copy()
+    while True:
+        change = gap_break | np.r_[True, code[1:] != code[:-1]]
+        starts = np.flatnonzero(change)
+        lengths = np.diff(np.r_[starts, n])
+        run_code = code[starts]
+        if len(starts) < 3:
+            return code
+
+        k = np.arange(1, len(starts) - 1)
+        absorb = np.zeros(len(starts), dtype=bool)
+        absorb[k] = (
+            (lengths[k] < min_run_length)
+            & ~gap_break[starts[k]]
+            & ~gap_break[starts[k + 1]]
+            & (run_code[k - 1] == run_code[k + 1])
+        )
+        # never relabel two neighbouring runs in the same sweep
+        absorb &= ~np.r_[False, absorb[:-1]]
+        if not absorb.any():
+            return code
+
+        run_code[absorb] = run_code[np.flatnonzero(absorb) - 1]
+        code = np.repeat(run_code, lengths)
+
+
+def segment_row_passes(df, max_id_gap=1, min_run_length=5):
+    """
+    Segments the Image_ID-sorted log into row passes: maximal runs of the same
+    (Assigned_Row, Direction), broken at Image_ID gaps larger than max_id_gap.
+    Flicker shorter than min_run_length frames inside a pass is suppressed.
+
+    Parameters:
+        df: DataFrame sorted by Image_ID with ['Image_ID', 'Assigned_Row', 'Direction'],
+            one record per image (per camera if a 'Camera' column is present)
+        max_id_gap: largest Image_ID step still considered the same pass
+        min_run_length: runs shorter than this between two runs of the same label are absorbed
+
+    Returns:
+        passes: DataFrame with ['Pass_ID', 'Start_Index', 'End_Index', 'Start_Image_ID',
+                'End_Image_ID', 'Assigned_Row', 'Direction', 'Num_Images'] (and 'Camera'),
+                where [Start_Index, End_Index) is the slice of df covered by the pass
+                (of the camera's own records when df has several cameras)
+        pass_ids: array with the Pass_ID of every record of df
+    """
+    n = len(df)
+    pass_ids = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return pd.DataFrame(columns=PASS_COLUMNS), pass_ids
+
+    if "Camera" in df.columns:
+        # one trajectory per camera; passes are numbered consecutively across cameras
+        tables = []
+        offset = 0
+        for cam, idx in df.groupby("Camera", sort=False).indices.items():
+            sub_passes, sub_ids = segment_row_passes(df.iloc[idx].drop(columns="Camera"), max_id_gap, min_run_length)
+            sub_passes["Pass_ID"] += offset
+            sub_passes.insert(1, "Camera", cam)
+            pass_ids[idx] = sub_ids + offset
+            offset += len(sub_passes)
+            tables.append(sub_passes)
+        return pd.concat(tables, ignore_index=True), pass_ids
+
+    ids = df["Image_ID"].to_numpy(dtype=np.int64)
+    if (np.diff(ids) <= 0).any():
+        raise ValueError("segment_row_passes expects strictly increasing Image_IDs.")
+
+    labels = pd.MultiIndex.from_arrays([df["Assigned_Row"].to_numpy(), df["Direction"].to_numpy()])
+    code, uniques = pd.factorize(labels)
+    gap_break = np.r_[True, np.diff(ids) > max_id_gap]
+    code = _smooth_labels(code, gap_break, min_run_length)
+
+    starts = np.flatnonzero(gap_break | np.r_[True, code[1:] != code[:-1]])
+    ends = np.r_[starts[1:], n]
+    pass_ids = np.repeat(np.arange(len(starts)), ends - starts)
+
+    run_labels = uniques[code[starts]]
+    passes = pd.DataFrame({
+        "Pass_ID": np.arange(len(starts)),
+        "Start_Index": starts,
+        "End_Index": ends,
+        "Start_Image_ID": ids[starts],
+        "End_Image_ID": ids[ends - 1],
+        "Assigned_Row": run_labels.get_level_values(0),
+        "Direction": run_labels.get_level_values(1),
+        "Num_Images": ends - starts,
+    })
+    return passes, pass_ids
@@ -0,0 +1,78 @@
+import pandas as pd
+import numpy as np
+from utils.getKinematics import check_kinematics
+
+GROUP_COLUMNS = ["Group_ID", "Representative_Image_ID", "Duplicate_Image_IDs", "Num_Frames",
+                 "Start_Image_ID", "End_Image_ID", "Duration_s"]
+
+
+def group_stationary_frames(df_img, kinematics, max_step_m=0.05, max_radius_m=0.25,
+                            max_time_gap_s=5.0, time_column="ROS_Time_Stamp"):
+    """
+    Groups runs of frames captured at effectively the same position (robot paused,
+    turning on the spot, waiting at a row end).
+
+    Two consecutive frames are linked when their Image_IDs are consecutive, the step
+    between them is at most max_step_m and (if time_column exists) at most max_time_gap_s
+    passed. A run of linked frames is split again every max_radius_m of travelled path,
+    so slow creeping does not chain frames over a long distance.
+
+    Parameters:
+        df_img: DataFrame sorted by Image_ID with ['Image_ID', 'Latitude', 'Longitude']
+        kinematics: output of compute_kinematics for df_img (uses Has_Next and Step_m)
+
+    Returns:
+        group_ids: group of every record (frames that moved are alone in their group)
+        is_representative: True for the frame kept for each group (the middle one)
+        groups: DataFrame with GROUP_COLUMNS for the groups with more than one frame
+    """
+    kin = check_kinematics(kinematics, df_img)
+    n = len(df_img)
+    ids = df_img["Image_ID"].to_numpy(dtype=np.int64)
+    step = kin["Step_m"].to_numpy(dtype=float)
+
+    link = kin["Has_Next"].to_numpy(dtype=bool) & (np.nan_to_num(step, nan=np.inf) <= max_step_m)
+    t = df_img[time_column].to_numpy(dtype=float) if time_column in df_img.columns else None
+    if t is not None and n > 1:
+        link[:-1] &= np.diff(t) <= max_time_gap_s
+    link[-1:] = False
+
+    # path length travelled along links, measured from the first frame of each run
+    run_start = np.r_[True, ~link[:-1]]
+    path = np.r_[0.0, np.cumsum(np.where(link, step, 0.0))[:-1]]
+    run_id = np.cumsum(run_start) - 1
+    sub = np.floor((path - path[run_start][run_id]) / max_radius_m)
+    group_start = run_start | np.r_[True, sub[1:] != sub[:-1]]
+
+    group_ids = np.cumsum(group_start) - 1
+    starts = np.flatnonzero(group_start)
+    sizes = np.diff(np.r_[starts, n])
+    rep_idx = starts + (sizes - 1) // 2
+    is_representative = np.zeros(n, dtype=bool)
+    is_representative[rep_idx] = True
+
+    multi = np.flatnonzero(sizes > 1)
+    dup = ~is_representative & (sizes[group_ids] > 1)
+    dup_lists = pd.Series(ids[dup].astype(str)).groupby(group_ids[dup]).agg(",".join)
+    ends = starts + sizes - 1
+    groups = pd.DataFrame({
+        "Group_ID": multi,
+        "Representative_Image_ID": ids[rep_idx[multi]],
+        "Duplicate_Image_IDs": dup_lists.reindex(multi).to_numpy(),
+        "Num_Frames": sizes[multi],
+        "Start_Image_ID": ids[starts[multi]],
+        "End_Image_ID": ids[ends[multi]],
+        "Duration_s": (t[ends[multi]] - t[starts[multi]]) if t is not None else np.nan,
+    }, columns=GROUP_COLUMNS)
+    return group_ids, is_representative, groups
+
+
+def collapse_stationary_frames(df, representative_ids, groups):
+    """
+    Keeps only the representative frame of every stationary group (all cameras of it with a rig)
+    and lists the dropped frames in a 'Duplicate_Image_IDs' column.
+    """
+    df = df[df["Image_ID"].isin(representative_ids)].copy()
+    duplicates = groups.set_index("Representative_Image_ID")["Duplicate_Image_IDs"]
+    df["Duplicate_Image_IDs"] = df["Image_ID"].map(duplicates).fillna("").to_numpy()
+    return df.reset_index(drop=True)
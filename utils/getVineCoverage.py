@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 import math
+from utils.asyncWriter import write_csv
+from utils.matchVinesInCamFOV import build_row_map, polyline_frame_coordinates, polyline_point_at_station
 
 def latlon_to_meters(lat, lon, ref_lat, ref_lon):
     d_lat = lat - ref_lat
@@ -45,6 +47,9 @@ def compute_vine_coverage_variable(row_file, vine_file, out_path,
             norm_d = 1.0
         row_map[row_val] = (ref_lat, ref_lon, dx, dy, norm_d)
 
+    # rows with intermediate vertices: stations along the polyline
+    curved = {r: v[5] for r, v in build_row_map(df_rows).items() if v[5] is not None}
+
     df_vines = pd.read_csv(vine_file)
     df_vines["Coverage_Start_Lon"] = np.nan
     df_vines["Coverage_Start_Lat"] = np.nan
@@ -64,7 +69,10 @@ def compute_vine_coverage_variable(row_file, vine_file, out_path,
             vine_lat = row_vine["Latitude"]
             vine_lon = row_vine["Longitude"]
             vx, vy = latlon_to_meters(vine_lat, vine_lon, ref_lat, ref_lon)
-            s_i = vx*direction_unit[0] + vy*direction_unit[1]
+            if row_val in curved:
+                s_i = polyline_frame_coordinates(np.array([vx]), np.array([vy]), curved[row_val])[0][0]
+            else:
+                s_i = vx*direction_unit[0] + vy*direction_unit[1]
             vine_info.append((row_vine["ID"], s_i, i))
 
         vine_info.sort(key=lambda x: x[0])
@@ -94,10 +102,13 @@ def compute_vine_coverage_variable(row_file, vine_file, out_path,
                 else:
                     coverage_end = s_i + cover_cfg["extend_not_continuous"]
 
-            cx_start = coverage_start*direction_unit[0]
-            cy_start = coverage_start*direction_unit[1]
-            cx_end   = coverage_end*direction_unit[0]
-            cy_end   = coverage_end*direction_unit[1]
+            if row_val in curved:
+                (cx_start, cx_end), (cy_start, cy_end) = polyline_point_at_station([coverage_start, coverage_end], curved[row_val])
+            else:
+                cx_start = coverage_start*direction_unit[0]
+                cy_start = coverage_start*direction_unit[1]
+                cx_end   = coverage_end*direction_unit[0]
+                cy_end   = coverage_end*direction_unit[1]
 
             lat_start, lon_start = meters_to_latlon(cx_start, cy_start, ref_lat, ref_lon)
             lat_end,   lon_end   = meters_to_latlon(cx_end,   cy_end,   ref_lat, ref_lon)
@@ -107,5 +118,5 @@ def compute_vine_coverage_variable(row_file, vine_file, out_path,
             df_vines.at[orig_idx, "Coverage_End_Lon"]   = lon_end
             df_vines.at[orig_idx, "Coverage_End_Lat"]   = lat_end
 
-    df_vines.to_csv(out_path, index=False)
+    write_csv(df_vines, out_path)
     print(f"\u2705 Coverage data saved to {out_path} with adjustable config: {cover_cfg}")
\ No newline at end of file
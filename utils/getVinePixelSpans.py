@@ -0,0 +1,85 @@
+import pandas as pd
+import numpy as np
+from utils.matchVinesInCamFOV import build_row_map, project_points_on_rows, row_frame_coordinates, parse_covered_vines
+
+
+def station_to_pixel(s, s_cam, depth, s_center, s_left, s_right, image_width):
+    """
+    Horizontal pixel coordinate of row stations s seen by a pinhole camera.
+
+    The camera sits at station s_cam, depth meters off the row line, and its optical
+    axis meets the row at s_center. A station is seen at angle a(s) - a(s_center)
+    from the axis with a(s) = atan((s - s_cam) / depth), and the pinhole maps that
+    angle to W/2 + f * tan(angle). The focal length f is taken from the FOV edges so
+    that s_left lands on column 0 and s_right on column image_width.
+    """
+    depth = np.maximum(np.abs(depth), 1e-6)
+    a_center = np.arctan2(s_center - s_cam, depth)
+    a_left = np.arctan2(s_left - s_cam, depth) - a_center
+    a_right = np.arctan2(s_right - s_cam, depth) - a_center
+    tan_half = np.tan((np.abs(a_left) + np.abs(a_right)) / 2.0)
+    sign = np.sign(s_right - s_left)
+    angle = np.arctan2(s - s_cam, depth) - a_center
+    return image_width / 2.0 * (1.0 + sign * np.tan(angle) / tan_half)
+
+
+def compute_vine_pixel_spans(df_imgs, row_file, vine_file, image_width):
+    """
+    Column range occupied by each matched vine in each image, so downstream jobs can
+    crop to the vine instead of processing the whole frame.
+
+    Parameters:
+        df_imgs: matcher output with ['Image_ID', 'Assigned_Row', 'Camera_Long', 'Camera_Lat',
+                 'FOV_*', 'Covered_Vines'] (and 'Camera' with a rig)
+        row_file: row start/end file
+        vine_file: vine coverage file (the coverage interval of each vine is mapped)
+        image_width: image width in pixels
+
+    Returns:
+        df_spans: one line per (image, vine) pair with ['Image_ID'(, 'Camera'), 'Row', 'ID',
+                  'Pixel_Start', 'Pixel_End'], columns Pixel_Start <= x < Pixel_End
+    """
+    row_map = build_row_map(pd.read_csv(row_file))
+    df_vines = pd.read_csv(vine_file)
+    df_imgs = df_imgs.reset_index(drop=True)
+
+    # (record, vine) pairs as matched by match_vines_in_fov
+    rec_idx, v_rows, v_ids = parse_covered_vines(df_imgs["Covered_Vines"])
+    vine_pos = pd.MultiIndex.from_arrays([df_vines["Row"], df_vines["ID"]]).get_indexer(
+        pd.MultiIndex.from_arrays([v_rows, v_ids]))
+    keep = vine_pos >= 0
+    rec_idx, vine_pos = rec_idx[keep], vine_pos[keep]
+
+    rows = df_imgs["Assigned_Row"].to_numpy()[rec_idx]
+
+    def station(prefix):
+        return project_points_on_rows(df_imgs[f"{prefix}_Long"].to_numpy(dtype=float)[rec_idx],
+                                      df_imgs[f"{prefix}_Lat"].to_numpy(dtype=float)[rec_idx], rows, row_map)
+
+    s_cam, depth = row_frame_coordinates(df_imgs["Camera_Long"].to_numpy(dtype=float)[rec_idx],
+                                         df_imgs["Camera_Lat"].to_numpy(dtype=float)[rec_idx], rows, row_map)
+    s_center, s_left, s_right = station("FOV_Center"), station("FOV_Left"), station("FOV_Right")
+
+    vine_rows = df_vines["Row"].to_numpy()[vine_pos]
+    v_st = project_points_on_rows(df_vines["Coverage_Start_Lon"].to_numpy(dtype=float)[vine_pos],
+                                  df_vines["Coverage_Start_Lat"].to_numpy(dtype=float)[vine_pos], vine_rows, row_map)
+    v_ed = project_points_on_rows(df_vines["Coverage_End_Lon"].to_numpy(dtype=float)[vine_pos],
+                                  df_vines["Coverage_End_Lat"].to_numpy(dtype=float)[vine_pos], vine_rows, row_map)
+
+    # only the part of the vine interval inside the FOV is visible
+    fov_lo, fov_hi = np.minimum(s_left, s_right), np.maximum(s_left, s_right)
+    vis_lo = np.clip(np.minimum(v_st, v_ed), fov_lo, fov_hi)
+    vis_hi = np.clip(np.maximum(v_st, v_ed), fov_lo, fov_hi)
+
+    u_a = station_to_pixel(vis_lo, s_cam, depth, s_center, s_left, s_right, image_width)
+    u_b = station_to_pixel(vis_hi, s_cam, depth, s_center, s_left, s_right, image_width)
+    pixel_start = np.clip(np.floor(np.minimum(u_a, u_b)), 0, image_width).astype(np.int64)
+    pixel_end = np.clip(np.ceil(np.maximum(u_a, u_b)), 0, image_width).astype(np.int64)
+
+    keys = [c for c in ["Image_ID", "Camera"] if c in df_imgs.columns]
+    df_spans = df_imgs.loc[rec_idx, keys].reset_index(drop=True)
+    df_spans["Row"] = vine_rows
+    df_spans["ID"] = df_vines["ID"].to_numpy()[vine_pos]
+    df_spans["Pixel_Start"] = pixel_start
+    df_spans["Pixel_End"] = pixel_end
+    return df_spans
@@ -0,0 +1,308 @@
+import pandas as pd
+import numpy as np
+import io
+import os
+from utils.getKinematics import compute_kinematics
+
+
+def is_stale(output_path, input_paths):
+    """
+    True if output_path does not exist or is older than any of the existing input files.
+    """
+    if not os.path.exists(output_path):
+        return True
+    out_time = os.path.getmtime(output_path)
+    return any(os.path.getmtime(p) > out_time for p in input_paths if p and os.path.exists(p))
+
+
+def read_last_records(csv_path, tail_bytes=65536):
+    """
+    Records with the largest Image_ID of an Image_ID-sorted CSV (one per camera for a rig),
+    reading only the header and the end of the file.
+    """
+    size = os.path.getsize(csv_path)
+    while True:
+        with open(csv_path, "rb") as f:
+            header = f.readline()
+            start = max(f.tell(), size - tail_bytes)
+            f.seek(start)
+            chunk = f.read()
+        if start > len(header):
+            chunk = chunk[chunk.find(b"\n") + 1:]  # drop the partial first line
+        df = pd.read_csv(io.BytesIO(header + chunk))
+        if df.empty:
+            return df
+        last_id = df["Image_ID"].max()
+        # the first parsed line may belong to the last image too: read more to be sure
+        if start <= len(header) or df["Image_ID"].iloc[0] != last_id:
+            return df[df["Image_ID"] == last_id].reset_index(drop=True)
+        tail_bytes *= 4
+
+
+def motion_context_start(df_gps, first_new, window=64):
+    """
+    Position of the last record before first_new whose motion vector comes from its own
+    step (Motion_Valid of compute_kinematics). Records after it reuse its vector, so a run
+    starting there gives the previous records and the new ones the vectors of a full run
+    even when the robot stood still across the boundary (0 if no record before moved).
+    """
+    end = first_new + 1
+    while True:
+        lo = max(0, first_new - window)
+        valid = np.flatnonzero(compute_kinematics(df_gps.iloc[lo:end])["Motion_Valid"].to_numpy()[:first_new - lo])
+        if len(valid):
+            return lo + valid[-1]
+        if lo == 0:
+            return 0
+        window *= 4
+
+
+def plan_incremental_run(df_gps, final_output_path, input_paths):
+    """
+    Selects the records an incremental run has to process.
+
+    Parameters:
+        df_gps: image GPS log sorted by Image_ID (with 'Latitude' and 'Longitude')
+        final_output_path: output CSV of the previous runs
+        input_paths: files the output depends on (rows, vines, rig); if one of them is newer
+                     than final_output_path the whole log is processed again
+
+    Returns:
+        df_run: records to process, empty if nothing is new; the new records are preceded by
+                already processed ones back to the last record with its own motion vector
+                (see motion_context_start)
+        df_last: last processed records of final_output_path, or None for a full run
+    """
+    if is_stale(final_output_path, input_paths):
+        return df_gps, None
+    df_last = read_last_records(final_output_path)
+    if df_last.empty:
+        return df_gps, None
+
+    ids = df_gps["Image_ID"].to_numpy()
+    new = np.flatnonzero(ids > df_last["Image_ID"].iloc[0])
+    if len(new) == 0:
+        return df_gps.iloc[:0], df_last
+    start = motion_context_start(df_gps, new[0])
+    return df_gps.iloc[start:].reset_index(drop=True), df_last
+
+
+def continue_pass_ids(df_passes, pass_ids, df_run, df_last):
+    """
+    Renumbers the row passes of an incremental run so they continue the Pass_IDs of the
+    previous output: the pass holding the last processed record (per camera) keeps that
+    record's Pass_ID, every other pass gets a new one after the largest existing Pass_ID.
+    Passes that end before the last processed record are already in the previous output:
+    they are dropped and their records get Pass_ID -1.
+
+    Returns:
+        passes, pass_ids: renumbered copies
+    """
+    if "Pass_ID" not in df_last.columns:
+        raise ValueError("The existing output has no Pass_ID column; rerun without --incremental.")
+
+    last_id = df_last["Image_ID"].iloc[0]
+    at_last = np.flatnonzero(df_run["Image_ID"].to_numpy() == last_id)
+    if "Camera" in df_last.columns:
+        last_pass = dict(zip(df_last["Camera"], df_last["Pass_ID"]))
+        known = {pass_ids[i]: last_pass[df_run["Camera"].iloc[i]] for i in at_last}
+    else:
+        known = {pass_ids[i]: df_last["Pass_ID"].iloc[0] for i in at_last}
+
+    mapping = {}
+    next_id = int(df_last["Pass_ID"].max()) + 1
+    for p, end_id in zip(df_passes["Pass_ID"], df_passes["End_Image_ID"]):
+        if end_id < last_id:
+            mapping[p] = -1
+        elif p in known:
+            mapping[p] = int(known[p])
+        else:
+            mapping[p] = next_id
+            next_id += 1
+
+    passes = df_passes.copy()
+    passes["Pass_ID"] = passes["Pass_ID"].map(mapping)
+    passes = passes[passes["Pass_ID"] >= 0].reset_index(drop=True)
+    return passes, pd.Series(pass_ids).map(mapping).to_numpy(dtype=np.int64)
+
+
+def merge_row_passes(df_passes, passes_path, log_offset):
+    """
+    Row pass table of an incremental run merged into the one written by the previous runs.
+
+    Parameters:
+        df_passes: passes of this run, renumbered by continue_pass_ids
+        passes_path: existing row pass table (only this run's passes are kept if it is missing)
+        log_offset: position of the first processed record in the whole sorted log
+
+    Returns:
+        passes: the existing passes, with the one continued by this run (same Pass_ID)
+                extended to its new end, followed by the newer passes; Start_Index and
+                End_Index are positions in the whole sorted log
+    """
+    passes = df_passes.copy()
+    passes["Start_Index"] += log_offset
+    passes["End_Index"] += log_offset
+    if not os.path.exists(passes_path):
+        return passes
+    old = pd.read_csv(passes_path)
+    if list(old.columns) != list(passes.columns):
+        raise ValueError(f"Columns of {passes_path} differ from this run; rerun without --incremental.")
+
+    continued = passes["Pass_ID"].isin(old["Pass_ID"]).to_numpy()
+    ends = passes[continued].set_index("Pass_ID")
+    sel = old["Pass_ID"].isin(ends.index).to_numpy()
+    pass_ids = old.loc[sel, "Pass_ID"]
+    # the (row, direction) label of the part holding more images wins
+    relabel = (pass_ids.map(ends["Num_Images"]) > old.loc[sel, "Num_Images"]).to_numpy()
+    for col in ["Assigned_Row", "Direction"]:
+        old.loc[sel, col] = np.where(relabel, pass_ids.map(ends[col]), old.loc[sel, col])
+    for col in ["End_Index", "End_Image_ID"]:
+        old.loc[sel, col] = pass_ids.map(ends[col]).to_numpy()
+    old.loc[sel, "Num_Images"] = old.loc[sel, "End_Index"] - old.loc[sel, "Start_Index"]
+    return pd.concat([old, passes[~continued]], ignore_index=True)
+
+
+def continue_stationary_groups(df_run, group_ids, is_representative, df_groups, df_last, groups_path=None,
+                               time_column="ROS_Time_Stamp"):
+    """
+    Joins the stationary groups of an incremental run (see group_stationary_frames) to the
+    ones of the previous runs. The frames from the last processed record on that belong to
+    its group in the existing table, and the frames linked to them, stay in that group, whose
+    representative is picked again (the middle frame). Its line in the output is the last
+    one, which an incremental run rewrites anyway. The Group_IDs of the other groups
+    continue after the existing ones.
+
+    Parameters:
+        df_run, group_ids, is_representative, df_groups: the run's log and its grouping
+        df_last: last records of the previous output
+        groups_path: existing stationary group table (None or missing: this run's groups only)
+
+    Returns:
+        is_representative: updated copy
+        groups: the existing groups with the continued one updated, followed by the new ones
+    """
+    ids = df_run["Image_ID"].to_numpy(dtype=np.int64)
+    last_id = df_last["Image_ID"].iloc[0]
+    old = pd.read_csv(groups_path) if groups_path and os.path.exists(groups_path) else None
+    if old is not None and list(old.columns) != list(df_groups.columns):
+        raise ValueError(f"Columns of {groups_path} differ from this run; rerun without --incremental.")
+
+    # group of the last processed record in the existing table, if it has one
+    prev = None
+    if old is not None:
+        hit = np.flatnonzero((old["Start_Image_ID"] <= last_id) & (old["End_Image_ID"] >= last_id))
+        prev = old.iloc[hit[-1]] if len(hit) else None
+    done_until = prev["End_Image_ID"] if prev is not None else last_id
+    # df_run may start before the last processed record: earlier groups are already written
+    g_first = group_ids[np.searchsorted(ids, last_id)]
+    g_done = group_ids[np.searchsorted(ids, done_until, side="right") - 1]
+    head = (group_ids >= g_first) & (group_ids <= g_done)
+
+    if prev is not None:
+        base = int(prev["Group_ID"])
+    else:
+        base = int(old["Group_ID"].max()) + 1 if old is not None and len(old) else 0
+    # keep the spacing of the run's group numbers (frames that moved are groups of one)
+    shift = base - int(g_done)
+
+    t = df_run[time_column].to_numpy(dtype=float) if time_column in df_run.columns else None
+    added = ids[head & (ids > done_until)]
+    if prev is not None:
+        dup = str(prev["Duplicate_Image_IDs"]) if pd.notna(prev["Duplicate_Image_IDs"]) else ""
+        frames = np.r_[np.sort([int(prev["Representative_Image_ID"])] + [int(d) for d in dup.split(",") if d]), added]
+        duration = prev["Duration_s"]
+        if len(added) and t is not None:
+            pos = np.searchsorted(ids, [prev["End_Image_ID"], added[-1]])
+            duration = duration + t[pos[1]] - t[pos[0]]
+    else:
+        pos = np.flatnonzero(head & (ids >= last_id))
+        frames = ids[pos]
+        duration = t[pos[-1]] - t[pos[0]] if t is not None else np.nan
+    rep_id = frames[(len(frames) - 1) // 2]
+    is_representative = is_representative.copy()
+    is_representative[head] = ids[head] == rep_id
+    head_rows = []
+    if len(frames) > 1:
+        head_rows = [pd.Series({
+            "Group_ID": base, "Representative_Image_ID": rep_id,
+            "Duplicate_Image_IDs": ",".join(frames[frames != rep_id].astype(str)),
+            "Num_Frames": len(frames), "Start_Image_ID": frames[0], "End_Image_ID": frames[-1],
+            "Duration_s": duration,
+        })]
+
+    tail = df_groups[df_groups["Group_ID"] > g_done].copy()
+    tail["Group_ID"] += shift
+    parts = [] if old is None else [old[old["Group_ID"] != base] if prev is not None else old]
+    parts += [pd.DataFrame(head_rows, columns=df_groups.columns), tail]
+    groups = pd.concat([p for p in parts if len(p)], ignore_index=True)
+    return is_representative, groups.reindex(columns=df_groups.columns)
+
+
+def new_records(df, df_last):
+    """
+    Records of df that are not in the previous output yet (all of df for a full run).
+    """
+    if df_last is None:
+        return df
+    return df[df["Image_ID"] > df_last["Image_ID"].iloc[0]]
+
+
+def records_to_write(df, df_last):
+    """
+    Records of an incremental run that go into the previous output: the recomputed last
+    records of that output (their motion vector needed the record that follows them,
+    which did not exist yet) followed by the new ones. All of df for a full run.
+    The last records are always replaced: with collapsed stationary frames the record
+    that stands for them may change (see continue_stationary_groups).
+
+    Returns:
+        df_write: records to write
+        num_replaced: number of trailing lines of the output they replace
+    """
+    if df_last is None:
+        return df, 0
+    return df[df["Image_ID"] >= df_last["Image_ID"].iloc[0]], len(df_last)
+
+
+def _tail_offset(f, num_lines, block=65536):
+    """
+    Byte offset where the last num_lines lines of the (newline-terminated) file f start.
+    """
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    if num_lines == 0:
+        return pos
+    data = b""
+    while True:
+        start = max(0, pos - block)
+        f.seek(start)
+        data = f.read(pos - start) + data
+        pos = start
+        cut = len(data) - 1
+        for _ in range(num_lines):
+            cut = data.rfind(b"\n", 0, cut)
+            if cut < 0:
+                break
+        if cut >= 0:
+            return start + cut + 1
+        if start == 0:
+            raise ValueError(f"{f.name} has fewer than {num_lines} records to replace.")
+
+
+def replace_last_records(df_records, csv_path, num_replaced=0):
+    """
+    Writes df_records at the end of csv_path in place of its last num_replaced lines
+    (0 = plain append). csv_path must have exactly the same columns.
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    if header != list(df_records.columns):
+        raise ValueError(
+            f"Columns of {csv_path} differ from this run ({header} vs {list(df_records.columns)}); "
+            "rerun without --incremental."
+        )
+    data = df_records.to_csv(header=False, index=False).encode("utf-8")
+    with open(csv_path, "r+b") as f:
+        f.seek(_tail_offset(f, num_replaced))
+        f.write(data)
+        f.truncate()
@@ -0,0 +1,165 @@
+import pandas as pd
+import numpy as np
+import time
+
+ROW_COLUMNS = ["Row", "ID", "Latitude", "Longitude"]
+VINE_COLUMNS = ["Row", "ID", "Latitude", "Longitude"]
+IMAGE_COLUMNS = ["Image_ID", "Latitude", "Longitude"]
+
+# padding (meters) around the row bounding box inside which vines / images must lie;
+# catches swapped Latitude/Longitude columns and logs from another block
+VINE_MARGIN_M = 50.0
+IMAGE_MARGIN_M = 1000.0
+
+
+def _preview(values, limit=5):
+    values = [v.item() if isinstance(v, np.generic) else v for v in values]
+    more = f" (+{len(values) - limit} more)" if len(values) > limit else ""
+    return f"{values[:limit]}{more}"
+
+
+def _read(path, columns, name, problems, dtype=None):
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [c for c in columns if c not in header]
+    if missing:
+        problems.append(f"{name} {path} is missing columns: {missing}")
+        return None
+    df = pd.read_csv(path, usecols=columns, dtype=dtype)
+    if df.empty:
+        problems.append(f"{name} {path} contains no data.")
+        return None
+    return df
+
+
+def _check_coordinates(df, name, problems):
+    """
+    Finite coordinates inside the valid range and not the (0, 0) no-fix placeholder.
+    Returns the mask of usable points.
+    """
+    lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+    bad = ~np.isfinite(lat) | ~np.isfinite(lon) | (np.abs(lat) > 90.0) | (np.abs(lon) > 180.0) | ((lat == 0.0) & (lon == 0.0))
+    if bad.any():
+        problems.append(f"{name} has {int(bad.sum())} missing or invalid coordinates at lines {_preview(np.flatnonzero(bad) + 2)}")
+    return ~bad
+
+
+def _outside_box(df, ok, box, margin_m, name, problems):
+    lat_min, lat_max, lon_min, lon_max = box
+    pad_lat = margin_m / 111320.0
+    pad_lon = margin_m / (111320.0 * np.cos(np.radians((lat_min + lat_max) / 2.0)))
+    lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+    far = ok & ((lat < lat_min - pad_lat) | (lat > lat_max + pad_lat) | (lon < lon_min - pad_lon) | (lon > lon_max + pad_lon))
+    if far.any():
+        problems.append(f"{name} has {int(far.sum())} points more than {margin_m:g} m outside the rows "
+                        f"(swapped Latitude/Longitude?) at lines {_preview(np.flatnonzero(far) + 2)}")
+
+
+def validate_inputs(row_file=None, vine_file=None, image_gps_file=None, time_column="ROS_Time_Stamp"):
+    """
+    Checks the row, grapevine and image GPS files before any step runs, so that a
+    malformed input stops the run immediately instead of failing (or silently
+    distorting results) deep inside it. Only the needed columns are read and every
+    check is a vectorized pass over them; files passed as None are skipped.
+
+    Checks:
+        - row file: required columns, exactly one 'S' and one 'E' per row, numeric
+          intermediate vertex IDs, no duplicated (Row, ID), S != E, coordinates
+        - grapevine file: required columns, integer IDs, no duplicated (Row, ID),
+          every vine row present in the row file, coordinates near the rows
+        - image GPS log: required columns, integer and unique Image_IDs,
+          time_column (if present) non-decreasing in Image_ID order, coordinates
+
+    Returns:
+        elapsed: validation time in seconds
+
+    Raises:
+        ValueError listing every problem found
+    """
+    t0 = time.perf_counter()
+    problems = []
+    row_values = None
+    box = None
+
+    if row_file is not None:
+        df = _read(row_file, ROW_COLUMNS, "Row file", problems, dtype={"ID": str})
+        if df is not None:
+            name = f"Row file {row_file}"
+            ok = _check_coordinates(df, name, problems)
+            ids = df["ID"].str.strip()
+            row_values = df["Row"].unique()
+            counts = pd.crosstab(df["Row"], ids.where(ids.isin(["S", "E"]), "other")).reindex(columns=["S", "E"], fill_value=0)
+            for label in ["S", "E"]:
+                wrong = counts.index[counts[label] != 1]
+                if len(wrong):
+                    problems.append(f"{name}: rows {_preview(wrong)} need exactly one '{label}' point "
+                                    f"(found {_preview(counts.loc[wrong, label])})")
+            mid = ~ids.isin(["S", "E"])
+            non_numeric = mid & pd.to_numeric(ids, errors="coerce").isna()
+            if non_numeric.any():
+                problems.append(f"{name} has non-numeric vertex IDs: {_preview(df.loc[non_numeric, 'ID'])}")
+            dup = df.assign(ID=ids).duplicated(subset=["Row", "ID"], keep=False) & mid
+            if dup.any():
+                problems.append(f"{name} has duplicated (Row, ID) vertices: {_preview(df.loc[dup, ['Row', 'ID']].drop_duplicates().itertuples(index=False, name=None))}")
+            ends = df[ok & ids.isin(["S", "E"]).to_numpy()].drop_duplicates(subset=["Row", "ID"])
+            ends = ends.assign(ID=ends["ID"].str.strip()).pivot(index="Row", columns="ID", values=["Latitude", "Longitude"])
+            if {("Latitude", "S"), ("Latitude", "E")} <= set(ends.columns):
+                zero = ((ends[("Latitude", "S")] == ends[("Latitude", "E")]) &
+                        (ends[("Longitude", "S")] == ends[("Longitude", "E")]))
+                if zero.any():
+                    problems.append(f"{name}: rows {_preview(ends.index[zero])} have identical 'S' and 'E' points")
+            if ok.any():
+                lat = df["Latitude"].to_numpy(dtype=float)[ok]
+                lon = df["Longitude"].to_numpy(dtype=float)[ok]
+                box = (lat.min(), lat.max(), lon.min(), lon.max())
+
+    if vine_file is not None:
+        df = _read(vine_file, VINE_COLUMNS, "Grapevine file", problems)
+        if df is not None:
+            name = f"Grapevine file {vine_file}"
+            ok = _check_coordinates(df, name, problems)
+            vid = pd.to_numeric(df["ID"], errors="coerce")
+            bad_id = vid.isna() | (vid != vid.round())
+            if bad_id.any():
+                problems.append(f"{name} has non-integer vine IDs at lines {_preview(np.flatnonzero(bad_id) + 2)}")
+            dup = df.duplicated(subset=["Row", "ID"], keep=False)
+            if dup.any():
+                problems.append(f"{name} has duplicated (Row, ID) vines: {_preview(df.loc[dup, ['Row', 'ID']].drop_duplicates().itertuples(index=False, name=None))}")
+            if row_values is not None:
+                unknown = np.setdiff1d(df["Row"].unique(), row_values)
+                if len(unknown):
+                    problems.append(f"{name} has vines on rows missing from the row file: {_preview(unknown)}")
+            if box is not None:
+                _outside_box(df, ok, box, VINE_MARGIN_M, name, problems)
+
+    if image_gps_file is not None:
+        header = pd.read_csv(image_gps_file, nrows=0).columns
+        columns = IMAGE_COLUMNS + ([time_column] if time_column in header else [])
+        df = _read(image_gps_file, columns, "Image GPS file", problems)
+        if df is not None:
+            name = f"Image GPS file {image_gps_file}"
+            ok = _check_coordinates(df, name, problems)
+            image_id = pd.to_numeric(df["Image_ID"], errors="coerce")
+            bad_id = image_id.isna() | (image_id != image_id.round())
+            if bad_id.any():
+                problems.append(f"{name} has non-integer Image_IDs at lines {_preview(np.flatnonzero(bad_id) + 2)}")
+            dup = image_id.duplicated(keep=False) & ~bad_id
+            if dup.any():
+                problems.append(f"{name} has {int(dup.sum())} lines with duplicated Image_IDs: {_preview(image_id[dup].unique().astype(np.int64))}")
+            elif not bad_id.any():
+                if not image_id.is_monotonic_increasing:
+                    print(f"[INFO] {name} is not sorted by Image_ID; it is sorted when loaded.")
+                if time_column in df.columns:
+                    order = np.argsort(image_id.to_numpy(), kind="stable")
+                    t = pd.to_numeric(df[time_column], errors="coerce").to_numpy(dtype=float)[order]
+                    back = np.flatnonzero(np.diff(t) < 0)
+                    if len(back):
+                        problems.append(f"{name}: {time_column} decreases between {len(back)} consecutive Image_IDs, "
+                                        f"e.g. after {_preview(image_id.to_numpy()[order][back].astype(np.int64))}")
+            if box is not None:
+                _outside_box(df, ok, box, IMAGE_MARGIN_M, name, problems)
+
+    if problems:
+        raise ValueError("Invalid input data:\n  - " + "\n  - ".join(problems))
+    return time.perf_counter() - t0
@@ -0,0 +1,127 @@
+import pandas as pd
+import numpy as np
+import json
+import math
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from utils.matchVinesInCamFOV import build_row_map, project_points_on_rows, parse_covered_vines
+
+
+class MatchIndex:
+    """
+    In-memory bidirectional index over the matcher output (Image_GPS_FOV_matched_vines.csv):
+        - (Row, ID) -> sorted Image_IDs showing the vine
+        - Image_ID  -> vines in the image
+        - Row + station range (meters from 'S' along the row) -> Image_IDs whose FOV overlaps it
+    Everything is built once at load time; lookups are dict hits or binary searches.
+    """
+
+    def __init__(self, df_imgs, row_file):
+        ids = df_imgs["Image_ID"].to_numpy(dtype=np.int64)
+        rec_idx, vine_rows, vine_ids = parse_covered_vines(df_imgs["Covered_Vines"])
+        pairs = pd.DataFrame({"Image_ID": ids[rec_idx], "Row": vine_rows, "ID": vine_ids}).drop_duplicates()
+
+        self.vine_to_images = {
+            (int(r), int(v)): np.sort(g["Image_ID"].to_numpy())
+            for (r, v), g in pairs.groupby(["Row", "ID"], sort=False)
+        }
+        self.image_to_vines = {
+            int(i): [(int(r), int(v)) for r, v in zip(g["Row"], g["ID"])]
+            for i, g in pairs.sort_values(["Image_ID", "Row", "ID"]).groupby("Image_ID", sort=False)
+        }
+        self.image_ids = np.unique(ids)
+
+        # FOV station intervals per row, sorted by start with the running max of the end
+        row_map = build_row_map(pd.read_csv(row_file))
+        rows = df_imgs["Assigned_Row"].to_numpy()
+        s_left = project_points_on_rows(df_imgs["FOV_Left_Long"], df_imgs["FOV_Left_Lat"], rows, row_map)
+        s_right = project_points_on_rows(df_imgs["FOV_Right_Long"], df_imgs["FOV_Right_Lat"], rows, row_map)
+        s_lo = np.minimum(s_left, s_right)
+        s_hi = np.maximum(s_left, s_right)
+        self.row_stations = {}
+        for row_val, idx in pd.Series(rows).groupby(rows, sort=False).indices.items():
+            idx = idx[~np.isnan(s_lo[idx])]
+            if len(idx) == 0:
+                continue
+            idx = idx[np.argsort(s_lo[idx], kind="stable")]
+            self.row_stations[int(row_val)] = (ids[idx], s_lo[idx], s_hi[idx], np.maximum.accumulate(s_hi[idx]))
+
+    @classmethod
+    def from_csv(cls, matched_file, row_file):
+        return cls(pd.read_csv(matched_file), row_file)
+
+    def images_for_vine(self, row, vine_id):
+        """
+        Sorted Image_IDs whose FOV covers vine (row, vine_id).
+        """
+        return self.vine_to_images.get((int(row), int(vine_id)), np.zeros(0, dtype=np.int64)).tolist()
+
+    def vines_for_image(self, image_id):
+        """
+        (row, vine_id) pairs covered by image_id (all cameras of a rig are merged).
+        """
+        return list(self.image_to_vines.get(int(image_id), []))
+
+    def images_in_station_range(self, row, start, end):
+        """
+        Sorted Image_IDs on `row` whose FOV station interval overlaps [start, end] (meters from 'S').
+        Raises ValueError for a NaN or infinite bound.
+        """
+        if not (math.isfinite(start) and math.isfinite(end)):
+            raise ValueError(f"station range bounds must be finite, got start={start}, end={end}")
+        if int(row) not in self.row_stations:
+            return []
+        lo_s, hi_s = min(start, end), max(start, end)
+        img, s_lo, s_hi, s_hi_prefix = self.row_stations[int(row)]
+        lo = np.searchsorted(s_hi_prefix, lo_s, side="left")
+        hi = np.searchsorted(s_lo, hi_s, side="right")
+        sel = np.arange(lo, max(lo, hi))
+        sel = sel[s_hi[sel] >= lo_s]
+        return np.unique(img[sel]).tolist()
+
+
+def _make_handler(index):
+    class MatchQueryHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                if url.path == "/vine":
+                    row, vine_id = int(query["row"]), int(query["id"])
+                    self._send(200, {"row": row, "id": vine_id, "image_ids": index.images_for_vine(row, vine_id)})
+                elif url.path == "/image":
+                    image_id = int(query["image_id"])
+                    vines = [f"{r}-{v}" for r, v in index.vines_for_image(image_id)]
+                    self._send(200, {"image_id": image_id, "vines": vines})
+                elif url.path == "/range":
+                    row, start, end = int(query["row"]), float(query["start"]), float(query["end"])
+                    self._send(200, {"row": row, "start": start, "end": end,
+                                     "image_ids": index.images_in_station_range(row, start, end)})
+                else:
+                    self._send(404, {"error": f"unknown endpoint {url.path}", "endpoints": ["/vine", "/image", "/range"]})
+            except (KeyError, ValueError) as e:
+                self._send(400, {"error": f"bad or missing parameter: {e}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return MatchQueryHandler
+
+
+def serve_match_index(index, host="127.0.0.1", port=8765):
+    """
+    Serves a MatchIndex over HTTP (JSON):
+        GET /vine?row=12&id=37             -> image IDs showing vine 12-37
+        GET /image?image_id=4021           -> vines in image 4021
+        GET /range?row=12&start=10&end=20  -> image IDs whose FOV overlaps stations 10-20 m of row 12
+    Returns the server; call serve_forever() on it.
+    """
+    return ThreadingHTTPServer((host, port), _make_handler(index))
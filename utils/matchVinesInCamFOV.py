@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import math
+from utils.rowSpatialIndex import row_polylines_from_frame
 
 def latlon_to_meters(lat, lon, ref_lat, ref_lon):
     d_lat = lat - ref_lat
@@ -15,20 +16,18 @@ def project_point_on_row(lon, lat, ref_lat, ref_lon, dx_r, dy_r, norm_d):
     direction_unit = np.array([dx_r, dy_r]) / norm_d
     return px * direction_unit[0] + py * direction_unit[1]
 
-def match_vines_in_fov(df_imgs, row_file, vine_file):
-    df_imgs = df_imgs.copy()
-    df_imgs["Covered_Vines"] = ""
-
-    df_vines = pd.read_csv(vine_file)
-    df_rows = pd.read_csv(row_file)
-
+def build_row_map(df_rows):
+    """
+    Returns {row: (ref_lat, ref_lon, dx_r, dy_r, norm_r, vertices)} with the row 'S'
+    point as reference and the S -> E vector in local meters. vertices is None for a
+    straight S/E row; for a curved row (intermediate vertices, see load_row_polylines)
+    it holds the polyline vertices in the same local meters, and norm_r is the row
+    length along the polyline.
+    """
     row_map = {}
-    for row_val in df_rows["Row"].unique():
-        sub = df_rows[df_rows["Row"] == row_val]
-        S = sub[sub["ID"] == "S"].iloc[0]
-        E = sub[sub["ID"] == "E"].iloc[0]
-        latS, lonS = S["Latitude"], S["Longitude"]
-        latE, lonE = E["Latitude"], E["Longitude"]
+    for row_val, pts in row_polylines_from_frame(df_rows).items():
+        lonS, latS = pts[0]
+        lonE, latE = pts[-1]
         ref_lat, ref_lon = latS, lonS
         sx, sy = latlon_to_meters(latS, lonS, ref_lat, ref_lon)
         ex, ey = latlon_to_meters(latE, lonE, ref_lat, ref_lon)
@@ -38,51 +37,206 @@ def match_vines_in_fov(df_imgs, row_file, vine_file):
         if norm_r < 1e-9:
             dx_r, dy_r = 1.0, 0.0
             norm_r = 1.0
-        row_map[row_val] = (ref_lat, ref_lon, dx_r, dy_r, norm_r)
+        vertices = None
+        if len(pts) > 2:
+            x = (pts[:, 0] - ref_lon) * 111320.0 * math.cos(math.radians(ref_lat))
+            y = (pts[:, 1] - ref_lat) * 111320.0
+            keep = np.r_[True, np.hypot(np.diff(x), np.diff(y)) > 1e-9]
+            if keep.sum() > 2:
+                vertices = np.column_stack([x[keep], y[keep]])
+                norm_r = float(np.hypot(*np.diff(vertices, axis=0).T).sum())
+        row_map[row_val] = (ref_lat, ref_lon, dx_r, dy_r, norm_r, vertices)
+    return row_map
 
-    vines_by_row = {}
-    for row_val in df_vines["Row"].unique():
-        if row_val not in row_map:
-            continue
-        subset_v = df_vines[df_vines["Row"] == row_val].copy()
-        ref_lat, ref_lon, dx_r, dy_r, norm_r = row_map[row_val]
-
-        vine_list = []
-        for _, v in subset_v.iterrows():
-            ID_ = int(v["ID"])
-            s_st = project_point_on_row(v["Coverage_Start_Lon"], v["Coverage_Start_Lat"], ref_lat, ref_lon, dx_r, dy_r, norm_r)
-            s_ed = project_point_on_row(v["Coverage_End_Lon"], v["Coverage_End_Lat"], ref_lat, ref_lon, dx_r, dy_r, norm_r)
-            s_min = min(s_st, s_ed)
-            s_max = max(s_st, s_ed)
-            vine_list.append((ID_, s_min, s_max))
-        vines_by_row[row_val] = vine_list
-
-    for i in range(len(df_imgs)):
-        row_val = df_imgs.at[i, "Assigned_Row"]
+def _polyline_segments(vertices):
+    """
+    Start points, unit directions, lengths and start stations of the polyline segments.
+    """
+    a = vertices[:-1]
+    d = np.diff(vertices, axis=0)
+    seg_len = np.hypot(d[:, 0], d[:, 1])
+    return a, d / seg_len[:, None], seg_len, np.r_[0.0, np.cumsum(seg_len)[:-1]]
+
+def polyline_frame_coordinates(px, py, vertices):
+    """
+    Station and signed offset of local-meter points (px, py) on the polyline through
+    vertices: the station is the length along the polyline up to the foot point on the
+    nearest segment. The first and last segments are extended beyond 'S' and 'E', as
+    in the row assignment.
+    """
+    a, u, seg_len, s0 = _polyline_segments(vertices)
+    lo = np.zeros(len(a))
+    lo[0] = -np.inf
+    hi = seg_len.copy()
+    hi[-1] = np.inf
+    rx = px[:, None] - a[:, 0]
+    ry = py[:, None] - a[:, 1]
+    t = np.clip(rx * u[:, 0] + ry * u[:, 1], lo, hi)
+    dist = np.hypot(rx - t * u[:, 0], ry - t * u[:, 1])
+    best = np.argmin(np.nan_to_num(dist, nan=np.inf), axis=1)
+    pick = np.arange(len(px))
+    station = s0[best] + t[pick, best]
+    offset = ry[pick, best] * u[best, 0] - rx[pick, best] * u[best, 1]
+    return station, offset
+
+def polyline_point_at_station(station, vertices):
+    """
+    Inverse of polyline_frame_coordinates on the polyline itself: local-meter (x, y) of
+    the points at the given stations (extrapolated along the first / last segment).
+    """
+    a, u, _, s0 = _polyline_segments(vertices)
+    station = np.asarray(station, dtype=float)
+    j = np.clip(np.searchsorted(s0, station, side="right") - 1, 0, len(a) - 1)
+    along = station - s0[j]
+    return a[j, 0] + along * u[j, 0], a[j, 1] + along * u[j, 1]
+
+def project_points_on_rows(lon, lat, rows, row_map):
+    """
+    Vectorized project_point_on_row: station (meters from 'S' along the row) of every
+    point on its own row. Points whose row is not in row_map get NaN.
+    """
+    return row_frame_coordinates(lon, lat, rows, row_map)[0]
+
+def row_frame_coordinates(lon, lat, rows, row_map):
+    """
+    Coordinates of every point in the frame of its own row: the station along S -> E
+    and the signed offset across it (meters, positive to the left of S -> E). Curved
+    rows use the station along the polyline and the offset from its nearest segment.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    rows = np.asarray(rows)
+    geo = np.full((len(rows), 4), np.nan)
+    curved = []
+    for row_val, (ref_lat, ref_lon, dx_r, dy_r, norm_r, vertices) in row_map.items():
+        mask = rows == row_val
+        if mask.any():
+            geo[mask] = (ref_lat, ref_lon, dx_r / norm_r, dy_r / norm_r)
+            if vertices is not None:
+                curved.append((mask, vertices))
+    px = (lon - geo[:, 1]) * 111320.0 * np.cos(np.radians(geo[:, 0]))
+    py = (lat - geo[:, 0]) * 111320.0
+    station, offset = px * geo[:, 2] + py * geo[:, 3], py * geo[:, 2] - px * geo[:, 3]
+    for mask, vertices in curved:
+        station[mask], offset[mask] = polyline_frame_coordinates(px[mask], py[mask], vertices)
+    return station, offset
+
+def build_vine_intervals(df_vines, row_map):
+    """
+    Projects every vine coverage interval onto its row and sorts them by start station.
+
+    Returns:
+        intervals: {row: (vine_idx, s_min, s_max, s_max_prefix)} where vine_idx are
+                   positions in df_vines and s_max_prefix is the running maximum of s_max
+    """
+    rows = df_vines["Row"].to_numpy()
+    s_st = project_points_on_rows(df_vines["Coverage_Start_Lon"], df_vines["Coverage_Start_Lat"], rows, row_map)
+    s_ed = project_points_on_rows(df_vines["Coverage_End_Lon"], df_vines["Coverage_End_Lat"], rows, row_map)
+    s_min = np.minimum(s_st, s_ed)
+    s_max = np.maximum(s_st, s_ed)
+
+    intervals = {}
+    for row_val, idx in df_vines.groupby("Row", sort=False).indices.items():
         if row_val not in row_map:
             continue
-        ref_lat, ref_lon, dx_r, dy_r, norm_r = row_map[row_val]
+        idx = idx[np.argsort(s_min[idx], kind="stable")]
+        intervals[row_val] = (idx, s_min[idx], s_max[idx], np.maximum.accumulate(s_max[idx]))
+    return intervals
 
-        left_lon  = df_imgs.at[i, "FOV_Left_Long"]
-        left_lat  = df_imgs.at[i, "FOV_Left_Lat"]
-        right_lon = df_imgs.at[i, "FOV_Right_Long"]
-        right_lat = df_imgs.at[i, "FOV_Right_Lat"]
+def match_stations_to_intervals(rows, s_lo, s_hi, intervals):
+    """
+    Sorted-interval lookup: for every record i with station range [s_lo[i], s_hi[i]] on
+    row rows[i], finds the intervals of that row overlapping the range.
 
-        if pd.isna(left_lon) or pd.isna(right_lon):
+    Returns:
+        rec_idx, vine_idx: matched pairs, sorted by record and then by vine_idx
+    """
+    rows = np.asarray(rows)
+    rec_parts = []
+    vine_parts = []
+    for row_val, (v_idx, v_min, v_max, v_max_prefix) in intervals.items():
+        recs = np.flatnonzero((rows == row_val) & ~np.isnan(s_lo) & ~np.isnan(s_hi))
+        if len(recs) == 0:
             continue
+        lo = np.searchsorted(v_max_prefix, s_lo[recs], side="left")
+        hi = np.searchsorted(v_min, s_hi[recs], side="right")
+        counts = np.maximum(hi - lo, 0)
+        total = counts.sum()
+        if total == 0:
+            continue
+        rec_rep = np.repeat(recs, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        cand = np.repeat(lo, counts) + offsets
+        keep = v_max[cand] >= np.repeat(s_lo[recs], counts)
+        rec_parts.append(rec_rep[keep])
+        vine_parts.append(v_idx[cand[keep]])
+
+    if not rec_parts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    rec_idx = np.concatenate(rec_parts)
+    vine_idx = np.concatenate(vine_parts)
+    order = np.lexsort((vine_idx, rec_idx))
+    return rec_idx[order], vine_idx[order]
+
+def match_fov_arrays(rows, left_lon, left_lat, right_lon, right_lat, row_map, intervals):
+    """
+    Array core of match_vines_in_fov: projects the FOV bounds onto the assigned row
+    and returns the matched (record, vine) pairs.
+    """
+    s_left = project_points_on_rows(left_lon, left_lat, rows, row_map)
+    s_right = project_points_on_rows(right_lon, right_lat, rows, row_map)
+    return match_stations_to_intervals(rows, np.minimum(s_left, s_right), np.maximum(s_left, s_right), intervals)
 
-        s_left  = project_point_on_row(left_lon,  left_lat,  ref_lat, ref_lon, dx_r, dy_r, norm_r)
-        s_right = project_point_on_row(right_lon, right_lat, ref_lat, ref_lon, dx_r, dy_r, norm_r)
-        fov_s_min = min(s_left, s_right)
-        fov_s_max = max(s_left, s_right)
+def format_covered_vines(n, rec_idx, vine_idx, df_vines):
+    """
+    Builds the 'Covered_Vines' strings ("row-id,row-id,...") for n records from matched pairs.
+    """
+    covered = np.full(n, "", dtype=object)
+    if len(rec_idx) == 0:
+        return covered
+    labels = (df_vines["Row"].astype(int).astype(str) + "-" + df_vines["ID"].astype(int).astype(str)).to_numpy()
+    joined = pd.Series(labels[vine_idx]).groupby(rec_idx).agg(",".join)
+    covered[joined.index.to_numpy()] = joined.to_numpy()
+    return covered
 
-        covered_vines = []
-        for (vineID, vine_s_min, vine_s_max) in vines_by_row[row_val]:
-            if vine_s_max < fov_s_min or vine_s_min > fov_s_max:
-                continue
-            covered_vines.append(f"{int(row_val)}-{int(vineID)}")
+def parse_covered_vines(covered):
+    """
+    Inverse of format_covered_vines: (rec_idx, rows, vine_ids) arrays with one entry per
+    "row-id" item of the 'Covered_Vines' strings, rec_idx being the position of the string.
+    """
+    items = pd.Series(np.asarray(covered, dtype=object)).fillna("").astype(str).str.split(",").explode().str.strip()
+    items = items[items != ""]
+    if len(items) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    parts = items.str.split("-", n=1, expand=True)
+    return items.index.to_numpy(dtype=np.int64), parts[0].astype(int).to_numpy(), parts[1].astype(int).to_numpy()
+
+def match_vines_in_fov(df_imgs, row_file, vine_file, chunk_rows=None, on_chunk=None):
+    """
+    Adds 'Covered_Vines' to df_imgs. With chunk_rows the records are matched in chunks
+    of that many lines and on_chunk (if given) receives every finished chunk right away,
+    e.g. to write it out while the next one is computed.
+    """
+    df_imgs = df_imgs.copy()
+
+    df_vines = pd.read_csv(vine_file)
+    df_rows = pd.read_csv(row_file)
 
-        if covered_vines:
-            df_imgs.at[i, "Covered_Vines"] = ",".join(covered_vines)
+    row_map = build_row_map(df_rows)
+    intervals = build_vine_intervals(df_vines, row_map)
 
+    n = len(df_imgs)
+    chunk_rows = chunk_rows or max(n, 1)
+    rows = df_imgs["Assigned_Row"].to_numpy()
+    fov = [df_imgs[c].to_numpy(dtype=float) for c in ["FOV_Left_Long", "FOV_Left_Lat", "FOV_Right_Long", "FOV_Right_Lat"]]
+    covered = np.full(n, "", dtype=object)
+    for start in range(0, max(n, 1), chunk_rows):
+        sl = slice(start, start + chunk_rows)
+        rec_idx, vine_idx = match_fov_arrays(rows[sl], *(a[sl] for a in fov), row_map, intervals)
+        covered[sl] = format_covered_vines(len(rows[sl]), rec_idx, vine_idx, df_vines)
+        if on_chunk is not None:
+            chunk = df_imgs.iloc[sl].copy()
+            chunk["Covered_Vines"] = covered[sl]
+            on_chunk(chunk)
+    df_imgs["Covered_Vines"] = covered
     return df_imgs
@@ -0,0 +1,139 @@
+import pandas as pd
+import numpy as np
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from utils.getFOVintersections import fov_intersections_arrays, FOV_COLUMNS
+from utils.rowSpatialIndex import load_row_polylines
+from utils.matchVinesInCamFOV import build_row_map, build_vine_intervals, match_fov_arrays, format_covered_vines
+
+# columns of the shared input block
+_CAM_LON, _CAM_LAT, _ROW_CODE, _AXIS_E, _AXIS_N, _FOV = range(6)
+
+_worker = {}
+
+
+def _init_worker(in_name, out_name, n, row_values, row_file, vine_file):
+    """
+    Attaches the shared input/output blocks and loads the (small) row and vine tables once per worker.
+    """
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    row_map = build_row_map(pd.read_csv(row_file))
+    _worker.update(
+        shm_in=shm_in,
+        shm_out=shm_out,
+        data=np.ndarray((n, 6), dtype=np.float64, buffer=shm_in.buf),
+        out=np.ndarray((n, 6), dtype=np.float64, buffer=shm_out.buf),
+        row_values=np.asarray(row_values, dtype=object),
+        row_polylines=load_row_polylines(row_file),
+        row_map=row_map,
+        intervals=build_vine_intervals(pd.read_csv(vine_file), row_map),
+    )
+
+
+def _process_shard(start, end):
+    """
+    FOV intersection and vine matching for records [start, end) of the shared block.
+    FOV points are written to the shared output block; matched pairs are returned.
+    """
+    data = _worker["data"][start:end]
+    codes = data[:, _ROW_CODE].astype(np.int64)
+    rows = np.where(codes >= 0, _worker["row_values"][np.maximum(codes, 0)], None)
+
+    fov = fov_intersections_arrays(
+        data[:, _CAM_LON], data[:, _CAM_LAT], rows,
+        data[:, _AXIS_E], data[:, _AXIS_N], data[:, _FOV], _worker["row_polylines"]
+    )
+    _worker["out"][start:end] = fov
+
+    rec_idx, vine_idx = match_fov_arrays(rows, fov[:, 2], fov[:, 3], fov[:, 4], fov[:, 5],
+                                         _worker["row_map"], _worker["intervals"])
+    return rec_idx + start, vine_idx
+
+
+def _shard_bounds(keys, workers, shards_per_worker=4):
+    """
+    Contiguous [start, end) shards of the key-sorted records: one per key, with
+    large keys split so every worker gets several shards to balance the load.
+    """
+    n = len(keys)
+    max_len = max(1, math.ceil(n / (workers * shards_per_worker)))
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], n]
+    bounds = []
+    for s, e in zip(starts, ends):
+        for b in range(s, e, max_len):
+            bounds.append((int(b), int(min(b + max_len, e))))
+    return bounds
+
+
+def compute_fov_and_match_parallel(df, row_file, vine_file, axis_east, axis_north, fov_deg,
+                                   workers=2, shard_by="Assigned_Row"):
+    """
+    Row-sharded parallel version of compute_fov_intersections + match_vines_in_fov.
+
+    Records are sorted by shard key (Assigned_Row or Pass_ID) and Image_ID, the coordinate
+    arrays are copied once into shared memory, and worker processes handle contiguous
+    shards of it without pickling the arrays. Results are written back in the original
+    (Image_ID) order of df.
+
+    Parameters:
+        df: DataFrame with ['Image_ID', 'Camera_Long', 'Camera_Lat', 'Assigned_Row'] (and shard_by)
+        row_file, vine_file: row start/end file and grapevine coverage file
+        axis_east, axis_north: optical axis unit vectors (local meters) per record
+        fov_deg: field of view, scalar or per record
+        workers: number of worker processes
+        shard_by: column used to shard the records ('Assigned_Row' or 'Pass_ID')
+
+    Returns:
+        df: copy of df with FOV_* columns and 'Covered_Vines'
+    """
+    df = df.copy()
+    n = len(df)
+    codes, row_values = pd.factorize(df["Assigned_Row"])
+    row_values = list(row_values)
+
+    order = np.lexsort((df["Image_ID"].to_numpy(), df[shard_by].to_numpy()))
+    data = np.column_stack([
+        df["Camera_Long"].to_numpy(dtype=float),
+        df["Camera_Lat"].to_numpy(dtype=float),
+        codes.astype(float),
+        np.broadcast_to(np.asarray(axis_east, dtype=float), (n,)),
+        np.broadcast_to(np.asarray(axis_north, dtype=float), (n,)),
+        np.broadcast_to(np.asarray(fov_deg, dtype=float), (n,)),
+    ])[order]
+    bounds = _shard_bounds(df[shard_by].to_numpy()[order], workers)
+
+    nbytes = max(1, data.nbytes)
+    shm_in = shared_memory.SharedMemory(create=True, size=nbytes)
+    shm_out = shared_memory.SharedMemory(create=True, size=nbytes)
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm_in.buf)[:] = data
+        out = np.ndarray(data.shape, dtype=np.float64, buffer=shm_out.buf)
+
+        rec_parts, vine_parts = [], []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm_in.name, shm_out.name, n, row_values, row_file, vine_file)) as ex:
+            for rec_idx, vine_idx in ex.map(_process_shard, *zip(*bounds)) if bounds else []:
+                rec_parts.append(rec_idx)
+                vine_parts.append(vine_idx)
+
+        # back to the original record order
+        fov = np.empty((n, 6))
+        fov[order] = out
+        del out
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+
+    for k, col in enumerate(FOV_COLUMNS):
+        df[col] = fov[:, k]
+
+    rec_idx = order[np.concatenate(rec_parts)] if rec_parts else np.zeros(0, dtype=np.int64)
+    vine_idx = np.concatenate(vine_parts) if vine_parts else np.zeros(0, dtype=np.int64)
+    sort = np.lexsort((vine_idx, rec_idx))
+    df["Covered_Vines"] = format_covered_vines(n, rec_idx[sort], vine_idx[sort], pd.read_csv(vine_file))
+    return df
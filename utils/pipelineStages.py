@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Parameters:
+        name: unique stage name (used by --stage on the CLI)
+        func: callable func(args, **inputs) returning a dict {output_name: value} (or None)
+        inputs: names of values produced by other stages
+        outputs: names of values this stage produces
+        main_thread: run on the main thread (e.g. matplotlib windows) instead of the pool
+        description: one-line description printed by --list_stages
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), main_thread=False, description=""):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.main_thread = main_thread
+        self.description = description
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={list(self.inputs)}, outputs={list(self.outputs)})"
+
+
+def check_stage_graph(stages):
+    """
+    Validates unique names/outputs, that every input has a producer and that the graph is acyclic.
+    Returns {output_name: producing stage}.
+    """
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicated stage names in {names}")
+
+    producer = {}
+    for s in stages:
+        for out in s.outputs:
+            if out in producer:
+                raise ValueError(f"Output '{out}' is produced by both '{producer[out].name}' and '{s.name}'")
+            producer[out] = s
+    for s in stages:
+        missing = [i for i in s.inputs if i not in producer]
+        if missing:
+            raise ValueError(f"Stage '{s.name}' needs {missing} but no stage produces it")
+
+    # Kahn's algorithm just to detect cycles
+    indegree = {s.name: len(set(producer[i].name for i in s.inputs)) for s in stages}
+    consumers = {s.name: [] for s in stages}
+    for s in stages:
+        for dep in set(producer[i].name for i in s.inputs):
+            consumers[dep].append(s.name)
+    ready = [n for n, d in indegree.items() if d == 0]
+    seen = 0
+    while ready:
+        n = ready.pop()
+        seen += 1
+        for c in consumers[n]:
+            indegree[c] -= 1
+            if indegree[c] == 0:
+                ready.append(c)
+    if seen != len(stages):
+        raise ValueError("The stage graph contains a cycle")
+    return producer
+
+
+def resolve_stages(stages, targets=None):
+    """
+    Names of the target stages and all their prerequisites (all stages if targets is None).
+    """
+    producer = check_stage_graph(stages)
+    by_name = {s.name: s for s in stages}
+    if targets is None:
+        return set(by_name)
+
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown}; available: {list(by_name)}")
+
+    selected = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name in selected:
+            continue
+        selected.add(name)
+        todo.extend(producer[i].name for i in by_name[name].inputs)
+    return selected
+
+
+def _call_stage(stage, args, inputs):
+    result = stage.func(args, **inputs)
+    result = {} if result is None else result
+    missing = [o for o in stage.outputs if o not in result]
+    if missing:
+        raise RuntimeError(f"Stage '{stage.name}' did not return {missing}")
+    return result
+
+
+def _abort_values(values):
+    """
+    Aborts the produced values that still hold an unfinished output (anything with an
+    abort() method, e.g. the AsyncCsvWriter of a streaming stage whose closing stage
+    never ran), so a failed run leaves no writer or temporary file behind.
+    """
+    for value in values.values():
+        abort = getattr(value, "abort", None)
+        if callable(abort):
+            try:
+                abort()
+            except Exception as e:
+                print(f"[WARN] Could not abort {type(value).__name__}: {e}")
+
+
+def run_stages(stages, args, targets=None, jobs=1, executor="thread"):
+    """
+    Runs the selected stages as soon as their inputs are available.
+
+    Parameters:
+        stages: list of Stage, in the preferred order for sequential runs
+        args: parsed CLI arguments passed to every stage
+        targets: stage names to run together with their prerequisites (None = all)
+        jobs: number of stages allowed to run concurrently (1 = sequential, in list order)
+        executor: 'thread' or 'process' pool for stages that are not main_thread
+
+    Returns:
+        values: dict of all produced values
+    """
+    selected = resolve_stages(stages, targets)
+    pending = [s for s in stages if s.name in selected]
+    values = {}
+
+    if jobs <= 1:
+        try:
+            while pending:
+                stage = next(s for s in pending if all(i in values for i in s.inputs))
+                pending.remove(stage)
+                values.update(_call_stage(stage, args, {i: values[i] for i in stage.inputs}))
+        except BaseException:
+            _abort_values(values)
+            raise
+        return values
+
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    running = {}
+    try:
+        with pool_cls(max_workers=jobs) as pool:
+            try:
+                while pending or running:
+                    ready = [s for s in pending if all(i in values for i in s.inputs)]
+                    for stage in ready:
+                        if not stage.main_thread and len(running) < jobs:
+                            pending.remove(stage)
+                            inputs = {i: values[i] for i in stage.inputs}
+                            running[pool.submit(_call_stage, stage, args, inputs)] = stage
+
+                    # main-thread stages (plots) run here while the pool keeps working
+                    main_ready = [s for s in ready if s.main_thread]
+                    if main_ready:
+                        stage = main_ready[0]
+                        pending.remove(stage)
+                        values.update(_call_stage(stage, args, {i: values[i] for i in stage.inputs}))
+                        continue
+
+                    if not running:
+                        raise RuntimeError(f"Stages {[s.name for s in pending]} can never run")
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        running.pop(fut)
+                        values.update(fut.result())
+            except BaseException:
+                for fut in running:
+                    fut.cancel()
+                raise
+    except BaseException:
+        # stages that were still running finished during the pool shutdown
+        for fut in running:
+            if not fut.cancelled() and fut.exception() is None:
+                values.update(fut.result())
+        _abort_values(values)
+        raise
+    return values
@@ -4,6 +4,8 @@ import matplotlib.pyplot as plt
 import math
 import random
 from matplotlib.patches import FancyArrow
+from utils.rowSpatialIndex import load_row_polylines
+from utils.resultBundle import open_result_store
 
 def plot_grapevines_data(ax, grapevines_file):
     """
@@ -143,7 +145,7 @@ def plot_camera_by_assigned_row(df_combined, row_file):
 
 def plot_random_fov_projection(df_combined, row_file, num_samples=20, window=10, fov_deg=60.5, seed=42):
     df = df_combined[df_combined['Assigned_Row'] != -1].sort_values(by='Image_ID').reset_index(drop=True)
-    df_row = pd.read_csv(row_file)
+    row_polylines = load_row_polylines(row_file)
     n = len(df)
     if n == 0:
         print("No valid data points with assigned row.")
@@ -170,14 +172,12 @@ def plot_random_fov_projection(df_combined, row_file, num_samples=20, window=10,
         fig, ax = plt.subplots(figsize=(10, 9))
         ax.set_title(f"Image_ID {center_id}, Row {row_val} (FOV Projection)")
 
-        # draw actual row segment from row_file
-        row_seg = df_row[df_row['Row'] == row_val]
-        if not row_seg.empty and len(row_seg) == 2:
-            s = row_seg[row_seg['ID'] == 'S'].iloc[0]
-            e = row_seg[row_seg['ID'] == 'E'].iloc[0]
-            ax.plot([s['Longitude'], e['Longitude']], [s['Latitude'], e['Latitude']], '-', color='blue', alpha=0.4, label=f'Row {row_val}')
-            ax.text((s['Longitude'] + e['Longitude']) / 2, (s['Latitude'] + e['Latitude']) / 2,
-                    f"Row {row_val}", fontsize=10, color='blue')
+        # draw actual row polyline (S -> vertices -> E) from row_file
+        if row_val in row_polylines:
+            pts = row_polylines[row_val]
+            ax.plot(pts[:, 0], pts[:, 1], '-', color='blue', alpha=0.4, label=f'Row {row_val}')
+            mid = pts[len(pts) // 2] if len(pts) % 2 else (pts[0] + pts[-1]) / 2
+            ax.text(mid[0], mid[1], f"Row {row_val}", fontsize=10, color='blue')
 
         ax.scatter(subset["Camera_Long"], subset["Camera_Lat"], color='gray', alpha=0.6, label='Surrounding Points')
         ax.scatter(cam[0], cam[1], color='black', s=60, label='Camera')
@@ -215,8 +215,18 @@ def meters_to_latlon(x, y, ref_lat, ref_lon):
     return lat, lon
 
 def visualize_matched_vines(df_image_path, df_vine_path, row_file_path, num_samples=5, seed=42):
-    df_imgs = pd.read_csv(df_image_path)
-    df_vines = pd.read_csv(df_vine_path)
+    """
+    Plots `num_samples` random matched images. `df_image_path` may be the matcher CSV, a
+    result bundle directory or the SQLite store (.db/.sqlite); with a bundle or store only
+    the sampled image and vine records are read.
+    """
+    store = open_result_store(df_image_path)
+    if store is None:
+        df_imgs = pd.read_csv(df_image_path)
+        df_vines = pd.read_csv(df_vine_path)
+        num_images = len(df_imgs)
+    else:
+        num_images = store.count_images()
     df_rows = pd.read_csv(row_file_path)
 
     # Build row map
@@ -240,10 +250,10 @@ def visualize_matched_vines(df_image_path, df_vine_path, row_file_path, num_samp
 
     # Randomly sample images to visualize
     random.seed(seed)
-    sampled = random.sample(list(df_imgs.index), min(num_samples, len(df_imgs)))
+    sampled = random.sample(range(num_images), min(num_samples, num_images))
 
     for i in sampled:
-        row = df_imgs.iloc[i]
+        row = df_imgs.iloc[i] if store is None else store.image_at(i)
         image_id = row["Image_ID"]
         row_val = row["Assigned_Row"]
         cam_lon = row["Camera_Long"]
@@ -296,11 +306,13 @@ def visualize_matched_vines(df_image_path, df_vine_path, row_file_path, num_samp
                         continue
 
         for vid in covered_list:
-            cond = (df_vines["Row"] == row_val) & (df_vines["ID"] == vid)
-            vine = df_vines[cond]
-            if vine.empty:
+            if store is None:
+                vine = df_vines[(df_vines["Row"] == row_val) & (df_vines["ID"] == vid)]
+                vine = None if vine.empty else vine.iloc[0]
+            else:
+                vine = store.vine(row_val, vid)
+            if vine is None:
                 continue
-            vine = vine.iloc[0]
             ax.scatter(vine["Longitude"], vine["Latitude"], color='blue', label='Vine Root')
             ax.plot([vine["Coverage_Start_Lon"], vine["Coverage_End_Lon"]],
                     [vine["Coverage_Start_Lat"], vine["Coverage_End_Lat"]], '-', color='green', label='Vine Coverage')
@@ -0,0 +1,113 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from utils.getFOVintersections import intersect_fov_with_rows, FOV_COLUMNS
+from utils.matchVinesInCamFOV import match_vines_in_fov, parse_covered_vines
+
+PREVIEW_COLUMNS = ["Stride", "Frames", "Frames_Total", "Records", "Unassigned_Ratio", "NaN_FOV_Ratio",
+                   "Vines_Per_Image", "Vine_Coverage_Ratio", "Elapsed_s"]
+
+
+def preview_levels(image_ids, pass_ids, strides=(64, 16, 4, 1)):
+    """
+    Progressively denser samples of the frames, stratified by row pass: level k holds
+    the frames at positions 0, stride_k, 2 * stride_k, ... from the start of every pass,
+    so each pass is represented from the first level on, short ones included.
+
+    Parameters:
+        image_ids, pass_ids: per record, sorted by Image_ID (several records per frame with a rig)
+        strides: decreasing strides, the last one usually 1 (= every frame)
+
+    Returns:
+        levels: list of (stride, record positions) holding only the records not sampled
+                by an earlier level
+    """
+    image_ids = np.asarray(image_ids)
+    pass_ids = np.asarray(pass_ids)
+    new_frame = np.r_[True, image_ids[1:] != image_ids[:-1]]
+    frame = np.cumsum(new_frame) - 1
+    frame_pass = pass_ids[new_frame]
+
+    # position of every frame inside its run of equal Pass_ID
+    run_start = np.r_[True, frame_pass[1:] != frame_pass[:-1]]
+    idx = np.arange(len(frame_pass))
+    pos = idx - np.maximum.accumulate(np.where(run_start, idx, 0))
+
+    seen = np.zeros(len(frame_pass), dtype=bool)
+    levels = []
+    for stride in strides:
+        take = (pos % stride == 0) & ~seen
+        seen |= take
+        if take.any():
+            levels.append((stride, np.flatnonzero(take[frame])))
+    return levels
+
+
+def preview_metrics(df_matched, num_frames_total, num_vines):
+    """
+    Sanity metrics of the records processed so far:
+        - Unassigned_Ratio: records without a row (Assigned_Row == -1)
+        - NaN_FOV_Ratio: records with at least one FOV intersection missing
+        - Vines_Per_Image: mean number of covered vines per record
+        - Vine_Coverage_Ratio: vines seen by at least one processed record (rises toward
+          the full-run value as the sample gets denser)
+    """
+    n = len(df_matched)
+    _, rows, vine_ids = parse_covered_vines(df_matched["Covered_Vines"])
+    num_seen = len(pd.MultiIndex.from_arrays([rows, vine_ids]).unique()) if len(rows) else 0
+    return {
+        "Frames": int(df_matched["Image_ID"].nunique()),
+        "Frames_Total": int(num_frames_total),
+        "Records": n,
+        "Unassigned_Ratio": round(float((df_matched["Assigned_Row"] == -1).mean()), 4),
+        "NaN_FOV_Ratio": round(float(df_matched[FOV_COLUMNS].isna().any(axis=1).mean()), 4),
+        "Vines_Per_Image": round(len(rows) / n, 3),
+        "Vine_Coverage_Ratio": round(num_seen / num_vines, 4) if num_vines else 0.0,
+    }
+
+
+def run_preview(df_with_passes, row_file, vine_file, axis_east, axis_north, fov_deg,
+                strides=(64, 16, 4, 1), output_path=None):
+    """
+    Runs FOV intersection and vine matching on the levels of preview_levels, from the
+    coarsest to the full set. After every level the metrics over all records processed
+    so far are printed and (with output_path) appended to a CSV right away, so a run
+    can be stopped as soon as the numbers look right.
+
+    Parameters:
+        df_with_passes: row pass output (sorted by Image_ID, with 'Pass_ID')
+        axis_east, axis_north, fov_deg: optical axis per record and FOV, aligned with df_with_passes
+
+    Returns:
+        df_report: one line per level with PREVIEW_COLUMNS
+    """
+    df = df_with_passes.reset_index(drop=True)
+    n = len(df)
+    axis_east = np.broadcast_to(np.asarray(axis_east, dtype=float), (n,))
+    axis_north = np.broadcast_to(np.asarray(axis_north, dtype=float), (n,))
+    fov_deg = np.broadcast_to(np.asarray(fov_deg, dtype=float), (n,))
+    num_frames = int(df["Image_ID"].nunique())
+    num_vines = len(pd.read_csv(vine_file, usecols=["Row", "ID"]))
+    if output_path is not None and os.path.exists(output_path):
+        os.remove(output_path)
+
+    t0 = time.perf_counter()
+    parts = []
+    report = []
+    for stride, idx in preview_levels(df["Image_ID"], df["Pass_ID"], strides):
+        df_level = intersect_fov_with_rows(df.iloc[idx].reset_index(drop=True), row_file,
+                                           axis_east[idx], axis_north[idx], fov_deg[idx])
+        parts.append(match_vines_in_fov(df_level, row_file, vine_file))
+        metrics = {"Stride": stride, **preview_metrics(pd.concat(parts, ignore_index=True), num_frames, num_vines),
+                   "Elapsed_s": round(time.perf_counter() - t0, 3)}
+        report.append(metrics)
+
+        print(f"[PREVIEW] 1/{stride:<4d} {metrics['Frames']}/{num_frames} frames | "
+              f"unassigned {metrics['Unassigned_Ratio']:.1%} | NaN FOV {metrics['NaN_FOV_Ratio']:.1%} | "
+              f"vines/image {metrics['Vines_Per_Image']:.2f} | vines covered {metrics['Vine_Coverage_Ratio']:.1%} | "
+              f"{metrics['Elapsed_s']:.2f} s", flush=True)
+        if output_path is not None:
+            pd.DataFrame([metrics], columns=PREVIEW_COLUMNS).to_csv(
+                output_path, mode="a", header=not os.path.exists(output_path), index=False)
+    return pd.DataFrame(report, columns=PREVIEW_COLUMNS)
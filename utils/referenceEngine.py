@@ -0,0 +1,242 @@
+import pandas as pd
+import numpy as np
+import math
+import time
+from utils.rowSpatialIndex import load_row_polylines
+from utils.getCaptureRow import point_to_line_distance_degree, assign_image_rows
+from utils.getFOVintersections import intersect_fov_with_rows, FOV_COLUMNS
+from utils.matchVinesInCamFOV import build_row_map, latlon_to_meters, project_point_on_row, match_vines_in_fov
+
+# Plain per-record loop versions of the geometry steps. They are slow but easy to
+# read, and serve as the reference the array implementations are checked against
+# (--engine reference / --verify in main_pipeline.py).
+
+
+def _polyline_distance(P, pts):
+    """
+    Distance (degrees) from point P to a row polyline whose first and last segments
+    are extended beyond 'S' and 'E'; a plain S/E row is an infinite line.
+    """
+    if len(pts) == 2:
+        d_raw = pts[1] - pts[0]
+        norm = np.linalg.norm(d_raw)
+        d = d_raw / norm if norm > 1e-6 else np.array([1.0, 0.0])
+        return point_to_line_distance_degree(P, pts[0], d)
+
+    best = float("inf")
+    last = len(pts) - 2
+    for j in range(len(pts) - 1):
+        a, b = pts[j], pts[j + 1]
+        ab = b - a
+        len2 = float(np.dot(ab, ab))
+        if len2 < 1e-24:
+            continue
+        t = float(np.dot(P - a, ab)) / len2
+        t = max(t, -math.inf if j == 0 else 0.0)
+        t = min(t, math.inf if j == last else 1.0)
+        best = min(best, float(np.linalg.norm(P - (a + t * ab))))
+    return best
+
+
+def assign_image_rows_reference(df_with_camera, row_file):
+    """
+    Loop version of assign_image_rows: compares every camera point with every row.
+    """
+    df = df_with_camera.copy()
+    cam_pts = np.vstack([df["Camera_Long"], df["Camera_Lat"]]).T
+    polylines = load_row_polylines(row_file)
+
+    assigned = []
+    for P in cam_pts:
+        best_row = -1
+        best_dist = float("inf")
+        for row_val, pts in polylines.items():
+            dist = _polyline_distance(P, pts)
+            if dist < best_dist:
+                best_dist = dist
+                best_row = row_val
+        assigned.append(best_row)
+
+    df["Assigned_Row"] = assigned
+    return df
+
+
+def fov_intersections_reference(df, row_file, axis_east, axis_north, fov_deg):
+    """
+    Loop version of intersect_fov_with_rows: casts the optical axis and its ±fov/2
+    boundaries of one record at a time onto every segment of its row (the first and
+    last extended; a plain S/E row is an infinite line), in local meters, and keeps
+    the nearest crossing.
+    """
+    polylines = load_row_polylines(row_file)
+    n = len(df)
+    cam_lon = df["Camera_Long"].to_numpy(dtype=float)
+    cam_lat = df["Camera_Lat"].to_numpy(dtype=float)
+    rows = df["Assigned_Row"].to_numpy()
+    axis_east = np.broadcast_to(np.asarray(axis_east, dtype=float), (n,))
+    axis_north = np.broadcast_to(np.asarray(axis_north, dtype=float), (n,))
+    fov_deg = np.broadcast_to(np.asarray(fov_deg, dtype=float), (n,))
+
+    out = np.full((n, 6), np.nan)
+    for i in range(n):
+        if rows[i] not in polylines:
+            continue
+        pts = polylines[rows[i]]
+        last = len(pts) - 2
+        lon_factor = 111320.0 * math.cos(math.radians(cam_lat[i]))
+
+        half = math.radians(fov_deg[i] / 2.0)
+        for k, angle in enumerate((0.0, half, -half)):
+            c, s = math.cos(angle), math.sin(angle)
+            r_x = c * axis_east[i] - s * axis_north[i]
+            r_y = s * axis_east[i] + c * axis_north[i]
+            best_t = math.inf
+            for j in range(len(pts) - 1):
+                p0_x = (pts[j][0] - cam_lon[i]) * lon_factor
+                p0_y = (pts[j][1] - cam_lat[i]) * 111320.0
+                d_x = (pts[j + 1][0] - pts[j][0]) * lon_factor
+                d_y = (pts[j + 1][1] - pts[j][1]) * 111320.0
+                denom = r_x * d_y - r_y * d_x
+                if abs(denom) < 1e-9:
+                    continue
+                t = (p0_x * d_y - p0_y * d_x) / denom
+                u = (p0_x * r_y - p0_y * r_x) / denom
+                if t < 0 or (j > 0 and u < 0) or (j < last and u > 1):
+                    continue
+                best_t = min(best_t, t)
+            if best_t == math.inf:
+                continue
+            out[i, 2 * k] = cam_lon[i] + best_t * r_x / lon_factor
+            out[i, 2 * k + 1] = cam_lat[i] + best_t * r_y / 111320.0
+
+    df = df.copy()
+    for k, col in enumerate(FOV_COLUMNS):
+        df[col] = out[:, k]
+    return df
+
+
+def _row_station(lon, lat, row_entry):
+    """
+    Loop version of project_points_on_rows for one point: projection onto S -> E, or
+    length along the polyline up to the foot point on the nearest segment of a curved row.
+    """
+    ref_lat, ref_lon, dx_r, dy_r, norm_r, vertices = row_entry
+    if vertices is None:
+        return project_point_on_row(lon, lat, ref_lat, ref_lon, dx_r, dy_r, norm_r)
+
+    px, py = latlon_to_meters(lat, lon, ref_lat, ref_lon)
+    best_dist, best_station = math.inf, math.nan
+    start = 0.0
+    last = len(vertices) - 2
+    for j in range(len(vertices) - 1):
+        ax, ay = vertices[j]
+        bx, by = vertices[j + 1]
+        seg_len = math.hypot(bx - ax, by - ay)
+        ux, uy = (bx - ax) / seg_len, (by - ay) / seg_len
+        t = (px - ax) * ux + (py - ay) * uy
+        if j > 0:
+            t = max(t, 0.0)
+        if j < last:
+            t = min(t, seg_len)
+        dist = math.hypot(px - (ax + t * ux), py - (ay + t * uy))
+        if dist < best_dist:
+            best_dist, best_station = dist, start + t
+        start += seg_len
+    return best_station
+
+
+def match_vines_in_fov_reference(df_imgs, row_file, vine_file):
+    """
+    Loop version of match_vines_in_fov: tests every vine of the assigned row for every image.
+    """
+    df_imgs = df_imgs.reset_index(drop=True).copy()
+    df_imgs["Covered_Vines"] = ""
+    df_vines = pd.read_csv(vine_file)
+    row_map = build_row_map(pd.read_csv(row_file))
+
+    vines_by_row = {}
+    for row_val in df_vines["Row"].unique():
+        if row_val not in row_map:
+            continue
+        vine_list = []
+        for _, v in df_vines[df_vines["Row"] == row_val].iterrows():
+            s_st = _row_station(v["Coverage_Start_Lon"], v["Coverage_Start_Lat"], row_map[row_val])
+            s_ed = _row_station(v["Coverage_End_Lon"], v["Coverage_End_Lat"], row_map[row_val])
+            vine_list.append((int(v["ID"]), min(s_st, s_ed), max(s_st, s_ed)))
+        vines_by_row[row_val] = vine_list
+
+    for i in range(len(df_imgs)):
+        row_val = df_imgs.at[i, "Assigned_Row"]
+        if row_val not in vines_by_row:
+            continue
+        left_lon, left_lat = df_imgs.at[i, "FOV_Left_Long"], df_imgs.at[i, "FOV_Left_Lat"]
+        right_lon, right_lat = df_imgs.at[i, "FOV_Right_Long"], df_imgs.at[i, "FOV_Right_Lat"]
+        if pd.isna(left_lon) or pd.isna(right_lon):
+            continue
+
+        s_left = _row_station(left_lon, left_lat, row_map[row_val])
+        s_right = _row_station(right_lon, right_lat, row_map[row_val])
+        fov_s_min, fov_s_max = min(s_left, s_right), max(s_left, s_right)
+
+        covered = [f"{int(row_val)}-{vine_id}" for vine_id, v_min, v_max in vines_by_row[row_val]
+                   if not (v_max < fov_s_min or v_min > fov_s_max)]
+        df_imgs.at[i, "Covered_Vines"] = ",".join(covered)
+    return df_imgs
+
+
+def verify_engines(df_combined, row_file, vine_file, axis_east, axis_north, fov_deg, sample=0, seed=0):
+    """
+    Runs row assignment, FOV intersection and vine matching with both engines on the
+    same records (all of them, or `sample` random ones) and compares the results.
+
+    Parameters:
+        df_combined: camera positions (output of the merge step)
+        axis_east, axis_north, fov_deg: optical axis per record and FOV, aligned with df_combined
+
+    Returns:
+        report: dict with the number of records compared, Assigned_Row and Covered_Vines
+                mismatches, the maximum FOV coordinate deviation (degrees and meters,
+                over records with the same row) and the run time of each engine
+    """
+    n = len(df_combined)
+    idx = np.arange(n)
+    if 0 < sample < n:
+        idx = np.sort(np.random.default_rng(seed).choice(n, size=sample, replace=False))
+    df = df_combined.iloc[idx].reset_index(drop=True)
+    axis_east = np.broadcast_to(np.asarray(axis_east, dtype=float), (n,))[idx]
+    axis_north = np.broadcast_to(np.asarray(axis_north, dtype=float), (n,))[idx]
+    fov_deg = np.broadcast_to(np.asarray(fov_deg, dtype=float), (n,))[idx]
+
+    t0 = time.perf_counter()
+    fast = assign_image_rows(df, row_file)
+    fast = intersect_fov_with_rows(fast, row_file, axis_east, axis_north, fov_deg)
+    fast = match_vines_in_fov(fast, row_file, vine_file)
+    t_fast = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ref = assign_image_rows_reference(df, row_file)
+    ref = fov_intersections_reference(ref, row_file, axis_east, axis_north, fov_deg)
+    ref = match_vines_in_fov_reference(ref, row_file, vine_file)
+    t_ref = time.perf_counter() - t0
+
+    row_mismatch = fast["Assigned_Row"].to_numpy() != ref["Assigned_Row"].to_numpy()
+    same_row = ~row_mismatch
+    a = fast[FOV_COLUMNS].to_numpy(dtype=float)[same_row]
+    b = ref[FOV_COLUMNS].to_numpy(dtype=float)[same_row]
+    nan_mismatch = int((np.isnan(a) != np.isnan(b)).any(axis=1).sum())
+    diff = np.abs(np.nan_to_num(a - b, nan=0.0))
+    lat = df["Camera_Lat"].to_numpy(dtype=float)[same_row]
+    diff_m = np.hypot(diff[:, 0::2] * 111320.0 * np.cos(np.radians(lat))[:, None], diff[:, 1::2] * 111320.0)
+    covered_mismatch = (fast["Covered_Vines"].fillna("").to_numpy() != ref["Covered_Vines"].fillna("").to_numpy())
+
+    return {
+        "records": len(df),
+        "assigned_row_mismatches": int(row_mismatch.sum()),
+        "fov_nan_mismatches": nan_mismatch,
+        "max_coordinate_deviation_deg": float(diff.max()) if diff.size else 0.0,
+        "max_coordinate_deviation_m": float(diff_m.max()) if diff_m.size else 0.0,
+        "covered_vines_mismatches": int(covered_mismatch.sum()),
+        "mismatched_image_ids": df["Image_ID"].to_numpy()[row_mismatch | covered_mismatch].tolist(),
+        "fast_s": t_fast,
+        "reference_s": t_ref,
+    }
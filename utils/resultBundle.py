@@ -0,0 +1,158 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+from utils.matchVinesInCamFOV import parse_covered_vines
+from utils.sqliteStore import is_sqlite_path, SQLiteResultStore
+
+BUNDLE_VERSION = 1
+COORD_COLUMNS = ["Camera_Long", "Camera_Lat", "FOV_Center_Long", "FOV_Center_Lat",
+                 "FOV_Left_Long", "FOV_Left_Lat", "FOV_Right_Long", "FOV_Right_Lat"]
+VINE_GEO_COLUMNS = ["Longitude", "Latitude", "Coverage_Start_Lon", "Coverage_Start_Lat",
+                    "Coverage_End_Lon", "Coverage_End_Lat"]
+
+
+def is_bundle_path(path):
+    return os.path.isfile(os.path.join(str(path), "meta.json"))
+
+
+def write_result_bundle(bundle_dir, df_imgs, df_vines):
+    """
+    Writes the matcher output as a directory of .npy arrays that can be memory-mapped:
+        - image_id, assigned_row, camera (code into meta 'cameras'): one entry per record
+        - coords: (n, 8) float64 with COORD_COLUMNS
+        - index_image_id, index_offsets: sorted unique Image_IDs and the CSR offsets of their
+          records (records of index_image_id[k] are index_offsets[k]:index_offsets[k + 1])
+        - vine_indptr, vine_indices: CSR adjacency record -> vines (positions in the vine arrays)
+        - vine_row, vine_id, vine_geo: vines sorted by (Row, ID), vine_geo with VINE_GEO_COLUMNS
+        - meta.json: version, counts and camera names
+    """
+    keys = [c for c in ["Image_ID", "Camera"] if c in df_imgs.columns]
+    df_imgs = df_imgs.sort_values(by=keys, kind="stable").reset_index(drop=True)
+    df_vines = df_vines.sort_values(by=["Row", "ID"], kind="stable").reset_index(drop=True)
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    def save(name, arr):
+        np.save(os.path.join(bundle_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+
+    image_id = df_imgs["Image_ID"].to_numpy(dtype=np.int64)
+    save("image_id", image_id)
+    save("assigned_row", df_imgs["Assigned_Row"].to_numpy(dtype=np.int64))
+    save("coords", df_imgs[COORD_COLUMNS].to_numpy(dtype=np.float64))
+    cameras = []
+    if "Camera" in df_imgs.columns:
+        codes, uniques = pd.factorize(df_imgs["Camera"])
+        cameras = [str(c) for c in uniques]
+        save("camera", codes.astype(np.int16))
+
+    index_image_id, starts = np.unique(image_id, return_index=True)
+    save("index_image_id", index_image_id)
+    save("index_offsets", np.r_[starts, len(image_id)].astype(np.int64))
+
+    rec_idx, rows, vine_ids = parse_covered_vines(df_imgs["Covered_Vines"])
+    vine_pos = pd.MultiIndex.from_arrays([df_vines["Row"], df_vines["ID"]]).get_indexer(
+        pd.MultiIndex.from_arrays([rows, vine_ids]))
+    rec_idx, vine_pos = rec_idx[vine_pos >= 0], vine_pos[vine_pos >= 0]
+    save("vine_indptr", np.r_[0, np.cumsum(np.bincount(rec_idx, minlength=len(df_imgs)))].astype(np.int64))
+    save("vine_indices", vine_pos.astype(np.int32))
+
+    save("vine_row", df_vines["Row"].to_numpy(dtype=np.int64))
+    save("vine_id", df_vines["ID"].to_numpy(dtype=np.int64))
+    save("vine_geo", df_vines[VINE_GEO_COLUMNS].to_numpy(dtype=np.float64))
+
+    with open(os.path.join(bundle_dir, "meta.json"), "w") as f:
+        json.dump({"version": BUNDLE_VERSION, "num_records": len(df_imgs), "num_vines": len(df_vines),
+                   "cameras": cameras, "coord_columns": COORD_COLUMNS, "vine_geo_columns": VINE_GEO_COLUMNS}, f, indent=2)
+    print(f"[INFO] Result bundle saved to {bundle_dir}")
+
+
+class ResultBundle:
+    """
+    Memory-mapped access to a bundle written by write_result_bundle. Opening only maps
+    the files; a lookup pages in the few entries it touches.
+    """
+
+    def __init__(self, bundle_dir):
+        with open(os.path.join(bundle_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported result bundle version {self.meta.get('version')} in {bundle_dir}")
+
+        def load(name):
+            return np.load(os.path.join(bundle_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.image_id = load("image_id")
+        self.assigned_row = load("assigned_row")
+        self.coords = load("coords")
+        self.camera = load("camera") if self.meta["cameras"] else None
+        self.index_image_id = load("index_image_id")
+        self.index_offsets = load("index_offsets")
+        self.vine_indptr = load("vine_indptr")
+        self.vine_indices = load("vine_indices")
+        self.vine_row = load("vine_row")
+        self.vine_id = load("vine_id")
+        self.vine_geo = load("vine_geo")
+
+    def close(self):
+        pass
+
+    def count_images(self):
+        return int(self.meta["num_records"])
+
+    def vines_at(self, position):
+        """
+        (row, vine_id) pairs covered by the record at `position`.
+        """
+        idx = self.vine_indices[self.vine_indptr[position]:self.vine_indptr[position + 1]]
+        return [(int(self.vine_row[j]), int(self.vine_id[j])) for j in idx]
+
+    def image_at(self, position):
+        """
+        Record at 0-based position (Image_ID, Camera order) as a Series with the CSV column names.
+        """
+        if not 0 <= position < self.count_images():
+            return None
+        rec = {"Image_ID": int(self.image_id[position])}
+        if self.camera is not None:
+            rec["Camera"] = self.meta["cameras"][int(self.camera[position])]
+        rec["Assigned_Row"] = int(self.assigned_row[position])
+        rec.update(zip(COORD_COLUMNS, self.coords[position].tolist()))
+        rec["Covered_Vines"] = ",".join(f"{r}-{v}" for r, v in self.vines_at(position))
+        return pd.Series(rec)
+
+    def positions_of(self, image_id):
+        """
+        Record positions of image_id (one per camera), found by binary search in the offset index.
+        """
+        k = int(np.searchsorted(self.index_image_id, image_id))
+        if k == len(self.index_image_id) or self.index_image_id[k] != image_id:
+            return range(0)
+        return range(int(self.index_offsets[k]), int(self.index_offsets[k + 1]))
+
+    def image_by_id(self, image_id):
+        return pd.DataFrame([self.image_at(i) for i in self.positions_of(image_id)])
+
+    def vine(self, row, vine_id):
+        """
+        Vine root and coverage interval for (row, vine_id), or None.
+        """
+        lo = int(np.searchsorted(self.vine_row, row, side="left"))
+        hi = int(np.searchsorted(self.vine_row, row, side="right"))
+        j = lo + int(np.searchsorted(self.vine_id[lo:hi], vine_id))
+        if j >= hi or self.vine_id[j] != vine_id:
+            return None
+        rec = {"Row": int(row), "ID": int(vine_id)}
+        rec.update(zip(VINE_GEO_COLUMNS, self.vine_geo[j].tolist()))
+        return pd.Series(rec)
+
+
+def open_result_store(path):
+    """
+    Record-level reader for a result bundle directory or a SQLite store; None for a CSV
+    (callers then load it with pandas).
+    """
+    if is_bundle_path(path):
+        return ResultBundle(path)
+    if is_sqlite_path(path):
+        return SQLiteResultStore(path)
+    return None
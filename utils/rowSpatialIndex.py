@@ -0,0 +1,243 @@
+import pandas as pd
+import numpy as np
+
+
+def load_row_polylines(row_file):
+    """
+    Reads a Row_SE_GPS_OBlock.csv-style file where every row is described by its
+    'S' and 'E' points and, optionally, intermediate vertices with numeric IDs
+    (e.g. S, 1, 2, 3, E) for curved rows.
+
+    Returns:
+        polylines: dict {row: array of shape (k, 2) with (Longitude, Latitude) vertices ordered S -> E}
+    """
+    return row_polylines_from_frame(pd.read_csv(row_file, dtype={"ID": str}), row_file)
+
+
+def row_polylines_from_frame(df_row, source="the row file"):
+    """
+    load_row_polylines for a row table that is already loaded.
+    """
+    ids = df_row["ID"].astype(str).str.strip()
+    is_s = (ids == "S").to_numpy()
+    is_e = (ids == "E").to_numpy()
+    mid = ~(is_s | is_e)
+    row_values = df_row["Row"].unique()
+    code = pd.Index(row_values).get_indexer(df_row["Row"])
+    order = pd.to_numeric(ids.where(mid), errors="coerce").to_numpy(dtype=float)
+
+    for k, row_val in enumerate(row_values):
+        on_row = code == k
+        if not (is_s & on_row).any() or not (is_e & on_row).any():
+            raise ValueError(f"Row {row_val} in {source} needs both an 'S' and an 'E' point.")
+        bad = on_row & mid & np.isnan(order)
+        if bad.any():
+            raise ValueError(f"Row {row_val} in {source} has non-numeric vertex IDs: {df_row['ID'][bad].tolist()}")
+
+    # first 'S', intermediate vertices by numeric ID, first 'E'
+    first_end = ~mid & ~pd.DataFrame({"Row": code, "ID": ids.to_numpy()}).duplicated().to_numpy()
+    key = np.where(is_s, -np.inf, np.where(is_e, np.inf, order))
+    idx = np.flatnonzero(first_end | mid)
+    idx = idx[np.lexsort((key[idx], code[idx]))]
+    pts = df_row[["Longitude", "Latitude"]].to_numpy(dtype=float)[idx]
+    bounds = np.searchsorted(code[idx], np.arange(len(row_values) + 1))
+    return {row_val: pts[bounds[k]:bounds[k + 1]] for k, row_val in enumerate(row_values)}
+
+
+def _point_segment_distance(px, py, x0, y0, x1, y1):
+    """
+    Broadcasted distance from points (px, py) to segments (x0, y0)-(x1, y1).
+    """
+    dx = x1 - x0
+    dy = y1 - y0
+    len2 = dx * dx + dy * dy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = ((px - x0) * dx + (py - y0) * dy) / len2
+    t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+    return np.hypot(px - (x0 + t * dx), py - (y0 + t * dy))
+
+
+class RowSegmentIndex:
+    """
+    Uniform grid index over the segments of all row polylines (in degree space).
+
+    The first and last segment of every row are extended beyond 'S' and 'E' so a
+    plain S/E row behaves like the infinite row line used before. For every grid
+    cell the index keeps only the segments that can be the nearest one for some
+    point of that cell, so a query costs O(nearby segments) instead of O(rows).
+    """
+
+    def __init__(self, polylines, cell_size=None, chunk_size=200000):
+        self.row_values = list(polylines.keys())
+        self.chunk_size = chunk_size
+
+        all_pts = np.vstack(list(polylines.values()))
+        lo = all_pts.min(axis=0)
+        hi = all_pts.max(axis=0)
+        pad = 0.5 * max(hi[0] - lo[0], hi[1] - lo[1], 1e-6)
+        self.origin = lo - pad
+        extent = (hi + pad) - self.origin
+        ext_len = 2.0 * float(np.hypot(*extent))
+
+        seg = []
+        seg_row = []
+        for k, pts in enumerate(polylines.values()):
+            keep = np.ones(len(pts), dtype=bool)
+            keep[1:] = np.hypot(*(np.diff(pts, axis=0).T)) > 1e-12
+            pts = pts[keep].copy()
+            if len(pts) == 1:
+                pts = np.vstack([pts, pts + [1e-6, 0.0]])
+            d0 = pts[1] - pts[0]
+            d1 = pts[-1] - pts[-2]
+            pts[0] = pts[0] - ext_len * d0 / np.linalg.norm(d0)
+            pts[-1] = pts[-1] + ext_len * d1 / np.linalg.norm(d1)
+            seg.append(np.hstack([pts[:-1], pts[1:]]))
+            seg_row.append(np.full(len(pts) - 1, k))
+        self.segments = np.vstack(seg)
+        self.segment_row = np.concatenate(seg_row)
+
+        if cell_size is None:
+            cell_size = 0.5 * np.sqrt(extent[0] * extent[1] / len(self.segments))
+        # keep the grid reasonably small
+        cell_size = max(cell_size, np.sqrt(extent[0] * extent[1] / 200000.0))
+        self.cell_size = float(cell_size)
+        self.shape = (int(np.ceil(extent[0] / cell_size)), int(np.ceil(extent[1] / cell_size)))
+
+        self._build_candidates()
+
+    def _build_candidates(self):
+        """
+        For every cell keep the segments whose distance to the cell center is within
+        one cell diagonal of the closest one: any other segment is farther from every
+        point of the cell than that closest segment.
+
+        The lists are built coarse to fine on grids of 2^L cells per side: the coarsest
+        grid (a handful of cells) is tested against all segments, every finer cell only
+        against the candidates of the coarser cell containing it, which hold every
+        segment that can be nearest to a point of that cell. The work follows the
+        number of nearby segments per cell instead of cells x segments.
+        """
+        nx, ny = self.shape
+        level = 0
+        while int(np.ceil(nx / 2 ** level)) * int(np.ceil(ny / 2 ** level)) > 64:
+            level += 1
+
+        flat = np.arange(len(self.segments))
+        offsets = np.array([0, len(flat)])
+        for lv in range(level, -1, -1):
+            size = self.cell_size * 2 ** lv
+            lx, ly = int(np.ceil(nx / 2 ** lv)), int(np.ceil(ny / 2 ** lv))
+            gx, gy = np.meshgrid(np.arange(lx), np.arange(ly), indexing="ij")
+            gx, gy = gx.ravel(), gy.ravel()
+            centers_x = self.origin[0] + (gx + 0.5) * size
+            centers_y = self.origin[1] + (gy + 0.5) * size
+            parent = np.zeros(len(gx), dtype=np.int64) if lv == level else (gx // 2) * int(np.ceil(ly / 2)) + gy // 2
+            # coarse levels only narrow the search: a little slack against rounding
+            diagonal = np.sqrt(2.0) * size * (1.0 if lv == 0 else 1.0 + 1e-6)
+            flat, offsets = self._filter_candidates(centers_x, centers_y, parent, flat, offsets, diagonal)
+
+        counts = np.diff(offsets)
+        self.max_candidates = int(counts.max())
+        self.cell_candidates = np.full((len(counts), self.max_candidates), -1, dtype=np.int64)
+        self.cell_candidates[np.repeat(np.arange(len(counts)), counts),
+                             np.arange(len(flat)) - np.repeat(offsets[:-1], counts)] = flat
+
+    def _filter_candidates(self, centers_x, centers_y, parent, flat, offsets, diagonal):
+        """
+        Keeps, for every center, the candidates of its parent cell (flat[offsets[p]:offsets[p + 1]])
+        within diagonal of the closest one, in the same order.
+
+        Returns:
+            flat, offsets: the kept candidate lists in the same flat layout
+        """
+        n = len(centers_x)
+        counts = offsets[parent + 1] - offsets[parent]
+        ends = np.cumsum(counts)
+        kept, kept_counts = [], []
+        start = 0
+        while start < n:
+            base = ends[start - 1] if start else 0
+            stop = max(start + 1, int(np.searchsorted(ends, base + self.chunk_size, side="right")))
+            cnt = counts[start:stop]
+            first = np.cumsum(cnt) - cnt
+            cell = np.repeat(np.arange(start, stop), cnt)
+            seg = flat[offsets[parent[cell]] + np.arange(cnt.sum()) - np.repeat(first, cnt)]
+            s = self.segments[seg]
+            dist = _point_segment_distance(centers_x[cell], centers_y[cell], s[:, 0], s[:, 1], s[:, 2], s[:, 3])
+            keep = dist <= np.repeat(np.minimum.reduceat(dist, first), cnt) + diagonal
+            kept.append(seg[keep])
+            kept_counts.append(np.bincount(cell[keep] - start, minlength=stop - start))
+            start = stop
+        return np.concatenate(kept), np.r_[0, np.cumsum(np.concatenate(kept_counts))]
+
+    def _nearest_among(self, px, py, cand):
+        """
+        Nearest segment for each point among its candidate list (-1 = padding).
+        """
+        valid = cand >= 0
+        s = self.segments[np.where(valid, cand, 0)]
+        dist = _point_segment_distance(px[:, None], py[:, None], s[..., 0], s[..., 1], s[..., 2], s[..., 3])
+        dist = np.where(valid, dist, np.inf)
+        best = np.argmin(dist, axis=1)
+        return cand[np.arange(len(px)), best], dist[np.arange(len(px)), best]
+
+    def query(self, points, in_meters=False):
+        """
+        Nearest row for each (Longitude, Latitude) point.
+
+        Parameters:
+            in_meters: return the distance in local meters instead of degrees (the offset
+                       to the nearest point of the polyline, longitude scaled by cos(lat))
+
+        Returns:
+            rows:     array of row values (-1 for points with NaN or infinite coordinates)
+            distance: array of distances (degrees, or meters) to the nearest row polyline
+                      (NaN for those points)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        n = len(points)
+        seg_idx = np.zeros(n, dtype=np.int64)
+        dist = np.full(n, np.inf)
+
+        # points with NaN or infinite coordinates have no nearest row
+        finite = np.isfinite(points).all(axis=1)
+        grid_pts = np.where(finite[:, None], points, self.origin)
+        ix = np.floor((grid_pts[:, 0] - self.origin[0]) / self.cell_size).astype(np.int64)
+        iy = np.floor((grid_pts[:, 1] - self.origin[1]) / self.cell_size).astype(np.int64)
+        inside = finite & (ix >= 0) & (ix < self.shape[0]) & (iy >= 0) & (iy < self.shape[1])
+
+        step = max(1, self.chunk_size // self.max_candidates)
+        idx_in = np.flatnonzero(inside)
+        for start in range(0, len(idx_in), step):
+            sel = idx_in[start:start + step]
+            cand = self.cell_candidates[ix[sel] * self.shape[1] + iy[sel]]
+            seg_idx[sel], dist[sel] = self._nearest_among(points[sel, 0], points[sel, 1], cand)
+
+        # points outside the indexed area: compare against every segment
+        idx_out = np.flatnonzero(finite & ~inside)
+        all_seg = np.arange(len(self.segments))
+        step = max(1, self.chunk_size // len(all_seg))
+        for start in range(0, len(idx_out), step):
+            sel = idx_out[start:start + step]
+            cand = np.broadcast_to(all_seg, (len(sel), len(all_seg)))
+            seg_idx[sel], dist[sel] = self._nearest_among(points[sel, 0], points[sel, 1], cand)
+
+        if in_meters:
+            dist = self._distance_m(grid_pts[:, 0], grid_pts[:, 1], self.segments[seg_idx])
+        dist[~finite] = np.nan
+        rows = np.asarray(self.row_values)[self.segment_row[seg_idx]]
+        return np.where(finite, rows, -1), dist
+
+    @staticmethod
+    def _distance_m(px, py, s):
+        """
+        Length in local meters of the offset from (px, py) to the closest point of segments s.
+        """
+        dx = s[:, 2] - s[:, 0]
+        dy = s[:, 3] - s[:, 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = ((px - s[:, 0]) * dx + (py - s[:, 1]) * dy) / (dx * dx + dy * dy)
+        t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+        d_lon = px - (s[:, 0] + t * dx)
+        d_lat = py - (s[:, 1] + t * dy)
+        return np.hypot(d_lon * 111320.0 * np.cos(np.radians(py)), d_lat * 111320.0)
@@ -0,0 +1,149 @@
+import pandas as pd
+import numpy as np
+import sqlite3
+from utils.matchVinesInCamFOV import parse_covered_vines
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+VINE_COLUMNS = ["Row", "ID", "Longitude", "Latitude"]
+COVERAGE_COLUMNS = ["Row", "ID", "Coverage_Start_Lon", "Coverage_Start_Lat", "Coverage_End_Lon", "Coverage_End_Lat"]
+
+INDEXES = [
+    ("idx_images_image_id", "images", ["Image_ID"]),
+    ("idx_images_assigned_row", "images", ["Assigned_Row"]),
+    ("idx_vines_row_id", "vines", ["Row", "ID"]),
+    ("idx_coverage_row_id", "vine_coverage", ["Row", "ID"]),
+    ("idx_image_vines_image_id", "image_vines", ["Image_ID"]),
+    ("idx_image_vines_row_id", "image_vines", ["Row", "ID"]),
+]
+
+
+def is_sqlite_path(path):
+    return str(path).lower().endswith(SQLITE_SUFFIXES)
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _python_rows(df):
+    """
+    Rows as plain Python values (NaN -> NULL) for sqlite3.
+    """
+    values = df.astype(object).where(df.notna(), None).to_numpy()
+    for row in values:
+        yield tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+
+
+def _write_table(conn, table, df, batch_size, append=False, replace_from_id=None):
+    cols = ", ".join(f'"{c}" {_sql_type(df[c].dtype)}' for c in df.columns)
+    if not append:
+        conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    elif replace_from_id is not None and conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+        # lines of recomputed records are replaced, not duplicated
+        with conn:
+            conn.execute(f'DELETE FROM "{table}" WHERE "Image_ID" >= ?', (int(replace_from_id),))
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols})')
+    sql = f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(df.columns))})'
+    rows = _python_rows(df)
+    while True:
+        batch = [r for _, r in zip(range(batch_size), rows)]
+        if not batch:
+            break
+        with conn:  # one transaction per batch
+            conn.executemany(sql, batch)
+
+
+def explode_covered_vines(df_imgs):
+    """
+    Long format of the Covered_Vines column: one (Image_ID[, Camera], Row, ID) line per matched vine.
+    """
+    keys = ["Image_ID"] + (["Camera"] if "Camera" in df_imgs.columns else [])
+    rec_idx, rows, vine_ids = parse_covered_vines(df_imgs["Covered_Vines"])
+    out = df_imgs[keys].iloc[rec_idx].reset_index(drop=True)
+    out["Row"] = rows
+    out["ID"] = vine_ids
+    return out
+
+
+def write_sqlite_store(db_path, df_imgs, df_vines, batch_size=10000, append=False, replace_from_id=None):
+    """
+    Writes the matcher output into an indexed SQLite database with tables:
+        - images:        one line per image (per camera) with all output columns
+        - vines:         Row, ID, Longitude, Latitude
+        - vine_coverage: Row, ID and coverage start/end points
+        - image_vines:   image-vine association (Image_ID[, Camera], Row, ID)
+    Inserts are batched, each batch inside one transaction; indexes are created afterwards.
+    With append=True the images and image_vines lines are added to the existing tables
+    (incremental runs), after removing their lines from Image_ID replace_from_id on (the
+    recomputed last records), while vines and vine_coverage are replaced.
+    """
+    df_imgs = df_imgs.sort_values(by=[c for c in ["Image_ID", "Camera"] if c in df_imgs.columns], kind="stable")
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _write_table(conn, "images", df_imgs, batch_size, append, replace_from_id)
+        _write_table(conn, "vines", df_vines[VINE_COLUMNS], batch_size)
+        _write_table(conn, "vine_coverage", df_vines[COVERAGE_COLUMNS], batch_size)
+        _write_table(conn, "image_vines", explode_covered_vines(df_imgs), batch_size, append, replace_from_id)
+        with conn:
+            for name, table, cols in INDEXES:
+                col_sql = ", ".join(f'"{c}"' for c in cols)
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({col_sql})')
+    finally:
+        conn.close()
+    print(f"[INFO] SQLite store saved to {db_path}")
+
+
+class SQLiteResultStore:
+    """
+    Read access to a database written by write_sqlite_store, fetching single records by key.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def count_images(self):
+        return self.conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def image_at(self, position):
+        """
+        Image record at 0-based position in (Image_ID, Camera) order.
+        """
+        row = self.conn.execute("SELECT * FROM images WHERE rowid = ?", (int(position) + 1,)).fetchone()
+        return None if row is None else pd.Series(dict(row))
+
+    def image_by_id(self, image_id):
+        """
+        Image record(s) for image_id as a DataFrame (one line per camera).
+        """
+        cur = self.conn.execute("SELECT * FROM images WHERE Image_ID = ?", (int(image_id),))
+        return pd.DataFrame([dict(r) for r in cur.fetchall()])
+
+    def vine(self, row, vine_id):
+        """
+        Vine root and coverage interval for (row, vine_id), or None.
+        """
+        rec = self.conn.execute(
+            "SELECT v.Row, v.ID, v.Longitude, v.Latitude, c.Coverage_Start_Lon, c.Coverage_Start_Lat, "
+            "c.Coverage_End_Lon, c.Coverage_End_Lat FROM vines v JOIN vine_coverage c "
+            "ON v.Row = c.Row AND v.ID = c.ID WHERE v.Row = ? AND v.ID = ?",
+            (int(row), int(vine_id))
+        ).fetchone()
+        return None if rec is None else pd.Series(dict(rec))
+
+    def images_for_vine(self, row, vine_id):
+        cur = self.conn.execute(
+            "SELECT DISTINCT Image_ID FROM image_vines WHERE Row = ? AND ID = ? ORDER BY Image_ID",
+            (int(row), int(vine_id))
+        )
+        return [r[0] for r in cur.fetchall()]
@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import math
+from utils.resultBundle import open_result_store
 
 def latlon_to_meters(lat, lon, ref_lat, ref_lon):
     d_lat = lat - ref_lat
@@ -18,8 +19,15 @@ def meters_to_latlon(x, y, ref_lat, ref_lon):
 
 class VineVisualizer:
     def __init__(self, matched_file, vine_file, row_file):
-        self.df_imgs = pd.read_csv(matched_file)
-        self.df_vines = pd.read_csv(vine_file)
+        # A result bundle directory or SQLite store (.db/.sqlite) is read one record at a
+        # time instead of loaded whole
+        self.store = open_result_store(matched_file)
+        if self.store is None:
+            self.df_imgs = pd.read_csv(matched_file)
+            self.df_vines = pd.read_csv(vine_file)
+            self.num_images = len(self.df_imgs)
+        else:
+            self.num_images = self.store.count_images()
         self.df_rows = pd.read_csv(row_file)
         self.index = 0
         self.row_map = self.build_row_map()
@@ -44,16 +52,27 @@ class VineVisualizer:
             row_map[row_val] = (ref_lat, ref_lon, dx, dy, norm)
         return row_map
 
+    def get_record(self, index):
+        if self.store is not None:
+            return self.store.image_at(index)
+        return self.df_imgs.iloc[index]
+
+    def get_vine(self, row, vine_id):
+        if self.store is not None:
+            return self.store.vine(row, vine_id)
+        tmp = self.df_vines[(self.df_vines["Row"] == row) & (self.df_vines["ID"] == vine_id)]
+        return None if tmp.empty else tmp.iloc[0]
+
     def on_key(self, event):
         if event.key == 'right':
-            self.index = min(self.index + 1, len(self.df_imgs) - 1)
+            self.index = min(self.index + 1, self.num_images - 1)
         elif event.key == 'left':
             self.index = max(self.index - 1, 0)
         self.show_current()
 
     def show_current(self):
         self.ax.clear()
-        rec = self.df_imgs.iloc[self.index]
+        rec = self.get_record(self.index)
         image_id = rec["Image_ID"]
         row_val = rec["Assigned_Row"]
         if row_val not in self.row_map:
@@ -83,10 +102,9 @@ class VineVisualizer:
         subset_v = []
         for (r, vid) in covered_list:
             if r == row_val:
-                cond = (self.df_vines["Row"] == r) & (self.df_vines["ID"] == vid)
-                tmp = self.df_vines[cond]
-                if not tmp.empty:
-                    subset_v.append(tmp.iloc[0])
+                vine = self.get_vine(r, vid)
+                if vine is not None:
+                    subset_v.append(vine)
 
         for j, vine in enumerate(subset_v):
             vine_lon = vine["Longitude"]
@@ -130,7 +148,7 @@ class VineVisualizer:
 
 
 if __name__ == "__main__":
-    matched_file = "Data/OBlock/Image_GPS_FOV_matched_vines.csv"
+    matched_file = "Data/OBlock/Image_GPS_FOV_matched_vines.csv"  # or a result bundle / SQLite store
     vine_file = "Data/OBlock/Grapevines_with_Coverage.csv"
     row_file = "Data/OBlock/Row_SE_GPS_OBlock.csv"
 